@@ -0,0 +1,234 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from PongFramework import *
+
+"""
+Benchmark suite for the frame pipeline of GameManager. Each scenario builds a scene on a headless game manager and times frames
+of Tick() followed by RenderOffscreen(). Results are printed as JSON and can be saved as a baseline and compared against later.
+
+    python Benchmark.py --output results.json
+    python Benchmark.py --save-baseline baseline.json
+    python Benchmark.py --baseline baseline.json
+"""
+
+screenSize = Vector2(1400, 800)
+
+#name: settings of each scenario. Synthetic scenarios are parameterized by object count, the fraction of objects with a rigid body
+#and with a collider, sprites per layer, and the number of text widgets whose text changes every frame. Scenarios with staticLayers draw
+#every layer from a cached surface
+scenarios = {
+    "pong": {"scene": "pong"},
+    "sprites": {"scene": "synthetic", "objects": 2000, "rigidBodies": 0, "colliders": 0, "spritesPerLayer": 200, "textWidgets": 0},
+    "sprites-static": {"scene": "synthetic", "objects": 2000, "rigidBodies": 0, "colliders": 0, "spritesPerLayer": 2000, "textWidgets": 0, "staticLayers": True},
+    "mixed": {"scene": "synthetic", "objects": 1000, "rigidBodies": 0.5, "colliders": 0.5, "spritesPerLayer": 100, "textWidgets": 10},
+    "physics": {"scene": "synthetic", "objects": 2000, "rigidBodies": 1, "colliders": 1, "spritesPerLayer": 2000, "textWidgets": 0},
+    "physics-array": {"scene": "synthetic", "objects": 2000, "rigidBodies": 1, "colliders": 1, "spritesPerLayer": 2000, "textWidgets": 0, "arrayPhysics": True},
+    "text-churn": {"scene": "synthetic", "objects": 100, "rigidBodies": 0, "colliders": 0, "spritesPerLayer": 100, "textWidgets": 100},
+}
+
+
+class SyntheticScene(Scene):
+    def __init__(self, gameManager, settings, seed):
+        super().__init__(gameManager)
+
+        if settings.get("arrayPhysics", False):
+            self.UseArrayPhysics()
+
+        if settings.get("staticLayers", False):
+            for layer in range(math.ceil(settings["objects"] / settings["spritesPerLayer"])):
+                self.renderList.SetStaticLayer(layer)
+
+        rand = random.Random(seed)
+        size = Vector2(8, 8)
+
+        for i in range(settings["objects"]):
+            position = Vector2(rand.uniform(0, screenSize.x - size.x), rand.uniform(0, screenSize.y - size.y))
+            box = Box(self, position, size, Colour.Random(rand))
+            box.sprite.layer = i // settings["spritesPerLayer"]
+
+            if rand.random() < settings["colliders"]:
+                box.collider = BoxCollider(box, size)
+
+            if rand.random() < settings["rigidBodies"]:
+                box.rigidBody = RigidBody(box)
+                box.rigidBody.velocity = Vector2(rand.uniform(-4, 4), rand.uniform(-4, 4))
+                box.scripts.append(Bounce(box))
+
+        widgetSize = Vector2(60, 30)
+        for i in range(settings["textWidgets"]):
+            position = Vector2((i * widgetSize.x) % screenSize.x, (i * widgetSize.x) // screenSize.x * widgetSize.y)
+            counter = Counter(self, position, widgetSize, Colour.black, 0, 20, Colour.white, "Times New Roman", Vector2(2, 2))
+            counter.scripts.append(CountUp(counter))
+
+
+class Bounce(Script):
+    #keeps a rigid body on the screen and turns it around when it hits something
+
+    def Update(self):
+        parent = self.parent
+        position = parent.transform.position
+        velocity = parent.rigidBody.velocity
+
+        if position.x < 0 or position.x > screenSize.x:
+            velocity.x *= -1
+        if position.y < 0 or position.y > screenSize.y:
+            velocity.y *= -1
+
+        if parent.collider != None and parent.collider.collisions != []:
+            velocity *= -1
+
+
+class CountUp(Script):
+    #changes the text of a Counter every frame
+
+    def Update(self):
+        self.parent.count = (self.parent.count + 1) % 1000
+        self.parent.UpdateCount()
+
+
+def CreateGameManager(settings, seed):
+    # returns a headless game manager running the scenario, and a function to call before each tick
+    gameManager = PongGM(screenSize, "Benchmark", [], headless=True, seed=seed)
+
+    if settings["scene"] == "synthetic":
+        gameManager.currentScene = SyntheticScene(gameManager, settings, seed)
+        return gameManager, None
+
+    #the Pong baseline plays rallies that never end, with both paddles following the puck
+    scene = TwoPlayer(gameManager)
+    gameManager.currentScene = scene
+
+    puck = None
+    paddles = []
+    for gameObject in scene.gameObjects:
+        for script in gameObject.scripts:
+            if type(script) is ScoreKeeper:
+                script.maxScore = math.inf
+            elif type(script) is PuckController:
+                puck = gameObject
+            elif type(script) is PlayerController:
+                paddles.append(gameObject)
+
+    def FollowPuck():
+        for paddle in paddles:
+            above = puck.transform.position.y < paddle.transform.position.y
+            below = puck.transform.position.y > paddle.transform.position.y + paddle.collider.size.y
+
+            if paddle.scripts[0].playerNum == 1:
+                gameManager.wDown, gameManager.sDown = above, below
+            else:
+                gameManager.upDown, gameManager.downDown = above, below
+
+    return gameManager, FollowPuck
+
+
+def RunFrames(gameManager, beforeTick, frames, render):
+    # runs frames and returns the time of each in seconds
+    frameTimes = []
+
+    for _ in range(frames):
+        start = time.perf_counter()
+
+        if beforeTick != None:
+            beforeTick()
+        gameManager.Tick()
+        if render:
+            gameManager.RenderOffscreen()
+
+        frameTimes.append(time.perf_counter() - start)
+
+    return frameTimes
+
+
+def Percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def RunScenario(settings, frames, warmupFrames, memoryFrames, render, seed):
+    gameManager, beforeTick = CreateGameManager(settings, seed)
+    RunFrames(gameManager, beforeTick, warmupFrames, render)
+    frameTimes = RunFrames(gameManager, beforeTick, frames, render)
+
+    #memory is measured in a separate run because tracing allocations slows every frame down
+    textCache.Clear()
+    surfaceCache.Clear()
+    tracemalloc.start()
+    gameManager, beforeTick = CreateGameManager(settings, seed)
+    RunFrames(gameManager, beforeTick, memoryFrames, render)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "frames": frames,
+        "fps": frames / sum(frameTimes),
+        "meanMs": sum(frameTimes) / frames * 1000,
+        "p50Ms": Percentile(frameTimes, 50) * 1000,
+        "p99Ms": Percentile(frameTimes, 99) * 1000,
+        "peakMemoryMB": peakMemory / 2 ** 20,
+    }
+
+
+def Compare(results, baseline, threshold):
+    # prints the change of each scenario against the baseline and returns the names of scenarios whose p50 frame time regressed by more than threshold
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        change = result["p50Ms"] / baseline[name]["p50Ms"] - 1
+        memoryChange = result["peakMemoryMB"] / max(baseline[name]["peakMemoryMB"], 1e-9) - 1
+        print("{:<16} p50 {:+7.1%}   p99 {:+7.1%}   memory {:+7.1%}".format(name, change, result["p99Ms"] / baseline[name]["p99Ms"] - 1, memoryChange))
+
+        if change > threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Benchmarks the GameManager frame pipeline on headless scenes")
+    parser.add_argument("--scenarios", nargs="*", default=list(scenarios), choices=list(scenarios))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--memory-frames", type=int, default=30)
+    parser.add_argument("--no-render", action="store_true", help="only run Tick(), without drawing to an off-screen surface")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="write the results as JSON to this baseline file")
+    parser.add_argument("--baseline", help="compare the results against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="p50 frame time increase that counts as a regression")
+    args = parser.parse_args()
+
+    pyg.init()
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = RunScenario(scenarios[name], args.frames, args.warmup, args.memory_frames, not args.no_render, args.seed)
+
+    text = json.dumps(results, indent=1)
+    print(text)
+
+    for path in (args.output, args.save_baseline):
+        if path != None:
+            with open(path, "w") as file:
+                file.write(text)
+
+    if args.baseline != None:
+        with open(args.baseline) as file:
+            regressions = Compare(results, json.load(file), args.threshold)
+
+        if regressions != []:
+            print("regressed: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    Main()
@@ -1,13 +1,33 @@
 import pygame as pyg
+import asyncio
+import bisect
+import gc
+import heapq
+import inspect
+import json
+import math
 import random
+import struct
 import sys
+import threading
 import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+#numpy is only needed by the optional ArrayPhysics backend
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 
 class Vector2:
 # Store 2D vectors
 
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -24,6 +44,48 @@ class Vector2:
     def __truediv__(self, factor):
         return Vector2(self.x / factor, self.y / factor)
 
+    #in-place operators change this vector instead of allocating a new one
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, factor):
+        self.x *= factor
+        self.y *= factor
+        return self
+
+    def __itruediv__(self, factor):
+        self.x /= factor
+        self.y /= factor
+        return self
+
+    def Set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
+
+    def CopyFrom(self, other):
+        self.x = other.x
+        self.y = other.y
+        return self
+
+    #vectors can be indexed like an (x, y) tuple, so they can be passed to pygame as positions
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        if index == 0:
+            return self.x
+        elif index == 1:
+            return self.y
+        raise IndexError("Vector2 index out of range")
+
     def __str__(self):
         return "[{}, {}]".format(self.x, self.y)
 
@@ -51,14 +113,116 @@ class Vector2:
         return Vector2(-1, 0)
 
 
+class ConstantVector2(Vector2):
+# Read-only Vector2 used for the cached constants Vector2.zero, up, down, right, and left. Use these instead of Zero(), Up(), etc. when the vector is not changed
+
+    __slots__ = ()
+
+    def __init__(self, x, y):
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("constant vectors are read-only")
+
+
+Vector2.zero = ConstantVector2(0, 0)
+Vector2.up = ConstantVector2(0, 1)
+Vector2.down = ConstantVector2(0, -1)
+Vector2.right = ConstantVector2(1, 0)
+Vector2.left = ConstantVector2(-1, 0)
+
+
+class ArrayVector2(Vector2):
+# Vector2 that reads and writes one row of a numpy array. Used by ArrayPhysics so that transforms and rigid bodies stay views into its arrays
+
+    __slots__ = ("array", "row")
+
+    def __init__(self, array, row):
+        self.array = array
+        self.row = row
+
+    @property
+    def x(self):
+        return self.array.item(self.row, 0)
+
+    @x.setter
+    def x(self, x):
+        self.array[self.row, 0] = x
+
+    @property
+    def y(self):
+        return self.array.item(self.row, 1)
+
+    @y.setter
+    def y(self, y):
+        self.array[self.row, 1] = y
+
+
+class TransformVector2(Vector2):
+# Vector2 owned by a Transform as its position. Every change, whether the position is assigned, Set(), changed with an in-place operator,
+# or has x or y assigned, calls the transform's Moved() once so the scene's indexes stay up to date
+
+    __slots__ = ("transform",)
+
+    #setters of the x and y slots, which are faster than object.__setattr__() and do not call Moved()
+    setX = Vector2.x.__set__
+    setY = Vector2.y.__set__
+
+    def __init__(self, transform, x, y):
+        object.__setattr__(self, "transform", transform)
+        self.setX(self, x)
+        self.setY(self, y)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        self.transform.Moved()
+
+    def SetXY(self, x, y):
+        # sets both coordinates and notifies the transform once
+        self.setX(self, x)
+        self.setY(self, y)
+        self.transform.Moved()
+        return self
+
+    def __iadd__(self, other):
+        return self.SetXY(self.x + other.x, self.y + other.y)
+
+    def __isub__(self, other):
+        return self.SetXY(self.x - other.x, self.y - other.y)
+
+    def __imul__(self, factor):
+        return self.SetXY(self.x * factor, self.y * factor)
+
+    def __itruediv__(self, factor):
+        return self.SetXY(self.x / factor, self.y / factor)
+
+    def Set(self, x, y):
+        return self.SetXY(x, y)
+
+    def CopyFrom(self, other):
+        self.setX(self, other.x)
+        self.setY(self, other.y)
+        self.transform.Moved()
+        return self
+
+
 class GameManager:
     """
     Base class for the game manager. Handles the updating of physics, controls, scripts, and graphics
     """
 
-    def __init__(self, screenSize, screenCaption, allowedEvents):
-        self.win =  pyg.display.set_mode(screenSize.Tuple(), pyg.FULLSCREEN)
-        pyg.display.set_caption(screenCaption)
+    def __init__(self, screenSize, screenCaption, allowedEvents, headless = False, seed = None):
+        #headless game managers create no window and do not draw, so they can run on a server or in a test.
+        #RenderOffscreen() can still draw the scene to a surface when it is needed
+        self.headless = headless
+        self.offscreen = None
+
+        if headless:
+            self.win = None
+        else:
+            self.win =  pyg.display.set_mode(screenSize.Tuple(), pyg.FULLSCREEN)
+            pyg.display.set_caption(screenCaption)
         self.winBGColour = Colour.white
         self.clock = pyg.time.Clock()
         self.allowedEvents = allowedEvents
@@ -69,113 +233,2363 @@ class GameManager:
         self.currentFrameTime =0.01
         self.updateTime = 0
 
-        self.mousePos = Vector2.Zero()
-        self.mouseDown = False
+        #key bindings, input callbacks, and the mouse. Mouse clicks are sent to the UI elements under the mouse
+        self.input = InputManager(self)
+
+        #region of the world that is drawn to the window
+        self.camera = Camera(screenSize)
+
+        #scenes that can be changed to by name, see RegisterScene()
+        self.scenes = {}
+
+        #event loop of RunAsync() while it runs, the thread that scenes and assets are loaded on, and the scene shown while one loads.
+        #See LoadScene()
+        self.loop = None
+        self.executor = None
+        self.loadingScene = None
+        self.loadingSceneFactory = LoadingScene
+
+        #finds the pairs of colliders that are passed to CheckForCollision()
+        self.broadphase = SpatialHashBroadphase()
+
+        #when enabled, only the regions of the window that changed since the last frame are redrawn and updated
+        self.dirtyRectRendering = False
+        self.drawnSprites = {}
+        self.drawnScene = None
+        self.drawnBGColour = None
+        self.drawnOverlayRect = None
+
+        if not headless:
+            pyg.event.set_allowed(allowedEvents)
+
+        self.currentScene = None
+
+        #Run() steps scripts and physics at tickRate ticks per second, independent of the frame rate.
+        #At most maxSubsteps ticks are run per frame so that a slow frame cannot cause more and more ticks to be needed
+        self.tickRate = 30
+        self.maxSubsteps = 5
+        self.tick = 0
+        self.accumulator = 0
+        self.running = False
+
+        #draw rigid bodies between their last two ticked positions
+        self.interpolate = True
+
+        #records the time spent in each phase of recent frames when enabled
+        self.profiler = FrameProfiler()
+
+        #random numbers come from streams seeded by seed, so a session can be run again with the same results. See CreateRandom()
+        if seed == None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.randomStreams = {}
+        self.randomLock = threading.Lock()
+
+        #scenes built on the loading thread count their random streams under a load number given out on the main thread
+        self.loadCount = 0
+        self.loadingStreams = threading.local()
+
+        #records the input of each tick when set, see InputRecorder
+        self.recorder = None
+
+    @property
+    def mousePos(self):
+        return self.input.mousePos
+
+    @mousePos.setter
+    def mousePos(self, mousePos):
+        self.input.mousePos.CopyFrom(mousePos)
+
+    @property
+    def mouseDown(self):
+        return self.input.mouseDown
+
+    @mouseDown.setter
+    def mouseDown(self, mouseDown):
+        self.input.mouseDown = mouseDown
+
+    def GetUpdateTime(self):
+        # gets the time since the last frame update
+        self.currentFrameTime = time.perf_counter()
+        self.updateTime = self.currentFrameTime - self.previousFrameTime
+
+        self.previousFrameTime = self.currentFrameTime
+
+    def Run(self, frameRate = 60, maxTicks = None):
+        # runs the game until Quit() is called or maxTicks ticks have run. Each frame handles events, runs the ticks that are due, and draws the scene.
+        # A frameRate of 0 does not limit the frame rate. Headless game managers run ticks back to back as fast as possible
+        self.running = True
+
+        profiler = self.profiler
+
+        if self.headless:
+            #each tick is profiled as a frame
+            while self.running and (maxTicks == None or self.tick < maxTicks):
+                profiler.BeginFrame()
+                self.Tick()
+                profiler.EndFrame()
+
+            self.running = False
+            return
+
+        self.accumulator = 0
+
+        self.GetUpdateTime()
+        while self.running:
+            self.clock.tick(frameRate)
+            self.RunFrame(maxTicks)
+
+            #scenes are preloaded when less than half of the frame's time has been used
+            if frameRate > 0 and time.perf_counter() - self.currentFrameTime < 0.5 / frameRate:
+                self.PreloadScene()
+
+    async def RunAsync(self, frameRate = 60, maxTicks = None):
+        # runs the game like Run() as a coroutine, which gives the event loop the time left in each frame instead of sleeping through it.
+        # While it runs, LoadScene() builds scenes and registered scenes are preloaded on the loading thread, see RunInExecutor()
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+
+        profiler = self.profiler
+
+        try:
+            if self.headless:
+                while self.running and (maxTicks == None or self.tick < maxTicks):
+                    profiler.BeginFrame()
+                    self.Tick()
+                    profiler.EndFrame()
+
+                    self.PreloadSceneAsync()
+                    await asyncio.sleep(0)
+
+                self.running = False
+                return
+
+            self.accumulator = 0
+
+            self.GetUpdateTime()
+            while self.running:
+                self.clock.tick()
+                self.RunFrame(maxTicks)
+                self.PreloadSceneAsync()
+
+                frameTime = 1 / frameRate if frameRate > 0 else 0
+                await asyncio.sleep(max(0, self.currentFrameTime + frameTime - time.perf_counter()))
+
+        finally:
+            #scenes that were still being preloaded are built again by the next run
+            for registration in self.scenes.values():
+                if registration.loading != None:
+                    registration.loading.cancel()
+                    registration.loading = None
+
+            if self.executor != None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+            self.loop = None
+
+    def RunFrame(self, maxTicks):
+        # handles events, runs the ticks that are due since the last frame, and draws the scene
+        profiler = self.profiler
+
+        self.GetUpdateTime()
+        profiler.BeginFrame()
+
+        eventsStart = time.perf_counter()
+        for event in pyg.event.get():
+            self.HandleEvent(event)
+        profiler.AddPhase("HandleEvents", eventsStart)
+
+        tickTime = 1 / self.tickRate
+        self.accumulator += self.updateTime
+
+        substeps = 0
+        while self.accumulator >= tickTime and self.running:
+            if maxTicks != None and self.tick >= maxTicks:
+                self.Quit()
+                break
+
+            if substeps == self.maxSubsteps:
+                #drop the time that could not be simulated instead of catching up on later frames
+                self.accumulator = 0
+                break
+
+            self.Tick()
+            self.accumulator -= tickTime
+            substeps += 1
+
+        windowStart = time.perf_counter()
+        if self.interpolate:
+            self.UpdateWindow(self.accumulator / tickTime)
+        else:
+            self.UpdateWindow()
+        profiler.AddPhase("UpdateWindow", windowStart)
+
+        profiler.EndFrame()
+
+    def Quit(self):
+        # stops Run() after the current frame
+        self.running = False
+
+    def HandleEvent(self, event):
+        # handles a pygame event. Key and mouse events are passed to the input manager, bind keys or subscribe to it to handle them
+        if event.type == pyg.QUIT:
+            self.Quit()
+        else:
+            self.input.HandleEvent(event)
+
+    def Tick(self):
+        # runs the scripts and physics for one fixed timestep
+
+        if self.profiler.recording:
+            profiler = self.profiler
+
+            start = time.perf_counter()
+            self.UpdateScripts()
+            start = profiler.AddPhase("UpdateScripts", start)
+            self.CastRigidBodies()
+            start = profiler.AddPhase("CastRigidBodies", start)
+            self.UpdateCollisions()
+            start = profiler.AddPhase("UpdateCollisions", start)
+            self.MoveRigidBodies()
+            start = profiler.AddPhase("MoveRigidBodies", start)
+            self.UpdateContacts()
+            profiler.AddPhase("UpdateContacts", start)
+        else:
+            self.UpdateScripts()
+            self.CastRigidBodies()
+            self.UpdateCollisions()
+            self.MoveRigidBodies()
+            self.UpdateContacts()
+
+        self.tick += 1
+
+        if self.recorder != None:
+            self.recorder.AfterTick()
+
+
+    def CreateRandom(self, name):
+        # returns a new random number generator for name, seeded by the game manager's seed, name, and how many have been created for name.
+        # Each scene gets its own, so the numbers it uses do not depend on when other scenes are built, like when a scene is preloaded
+        prefix = getattr(self.loadingStreams, "prefix", None)
+
+        if prefix != None:
+            #the streams of a scene built on the loading thread do not depend on what the main thread creates meanwhile, see BuildLoadedScene()
+            counts = self.loadingStreams.counts
+            count = counts.get(name, 0)
+            counts[name] = count + 1
+
+            return random.Random("{}:{}/{}:{}".format(self.seed, prefix, name, count))
+
+        with self.randomLock:
+            count = self.randomStreams.get(name, 0)
+            self.randomStreams[name] = count + 1
+
+        return random.Random("{}:{}:{}".format(self.seed, name, count))
+
+    def GetStateChecksum(self):
+        # returns a checksum of the current scene, the tick, and the exact positions and velocities of its game objects
+        scene = self.currentScene
+        checksum = zlib.crc32(type(scene).__name__.encode(), self.tick)
+
+        for gameObject in scene.gameObjects:
+            position = gameObject.transform.position
+            checksum = zlib.crc32(struct.pack("<2d", position.x, position.y), checksum)
+
+            if gameObject.rigidBody != None:
+                velocity = gameObject.rigidBody.velocity
+                checksum = zlib.crc32(struct.pack("<2d", velocity.x, velocity.y), checksum)
+
+        return checksum
+
+    def Replay(self, recording):
+        # runs a recorded session as fast as possible, applying its input before the same ticks it was recorded at. The game manager
+        # must have been created with the recording's seed and screen size. Returns the ticks whose checksum did not match the recording
+        mismatches = []
+
+        for tick, kind, values in recording.records:
+            while self.tick < tick:
+                self.profiler.BeginFrame()
+                self.Tick()
+                self.profiler.EndFrame()
+
+            if kind == InputRecording.actionsChanged:
+                for index, action in enumerate(recording.actions):
+                    self.input.SetAction(action, values[0] >> index & 1 == 1)
+
+            elif kind == InputRecording.mouseDown or kind == InputRecording.mouseUp:
+                eventType = pyg.MOUSEBUTTONDOWN if kind == InputRecording.mouseDown else pyg.MOUSEBUTTONUP
+                self.HandleEvent(pyg.event.Event(eventType, pos=values, button=1))
+
+            elif kind == InputRecording.checksum:
+                if self.GetStateChecksum() != values[0]:
+                    mismatches.append(tick)
+
+        return mismatches
+
+    def ChangeScene(self, newScene, *args):
+        # changes to newScene, which is either a scene or the name of a registered scene. args are passed to the scene's factory or Reset()
+        if type(newScene) is str:
+            newScene = self.GetScene(newScene, *args)
+
+        del self.currentScene
+        self.currentScene = newScene
+
+        #a pooled scene can be changed back to, so the whole window is redrawn
+        self.drawnScene = None
+
+    def RegisterScene(self, name, factory, pooled = False, preload = False):
+        # registers a scene that is only built when it is first changed to. factory(gameManager, *args) returns the scene.
+        # Pooled scenes are built once and Reset(*args) each time they are used again.
+        # Preloaded scenes are built ahead of time while Run() has idle frame time
+        self.scenes[name] = SceneRegistration(factory, pooled, preload)
+
+    def GetScene(self, name, *args):
+        # returns the registered scene, building it if there is no pooled or preloaded instance
+        registration = self.scenes[name]
+        scene = registration.instance
+
+        if scene == None:
+            return self.BuildScene(name, *args)
+
+        if registration.pooled:
+            scene.Reset(*args)
+        else:
+            #a preloaded scene is only used once
+            registration.instance = None
+
+        scene.registeredArgs = args
+        return scene
+
+    def BuildScene(self, name, *args):
+        # builds the registered scene with its factory and returns it. A pooled scene is kept to be reset the next time it is used.
+        # Every scene a registration builds goes through here, on the main thread or on the loading thread
+        registration = self.scenes[name]
+        scene = registration.factory(self, *args)
+
+        scene.registeredName = name
+        scene.registeredArgs = args
+
+        if registration.pooled:
+            registration.instance = scene
+
+        return scene
+
+    def PreloadScene(self):
+        # builds the next registered scene that should be preloaded and has not been built. Returns True if a scene was built
+        for name, registration in self.scenes.items():
+            if registration.preload and registration.instance == None and registration.loading == None:
+                registration.instance = self.BuildScene(name)
+                return True
+
+        return False
+
+    def CanLoadAsync(self):
+        # scenes are only built on the loading thread while RunAsync() is running. Recorded sessions change scenes on the tick they were asked
+        # for, so that they replay exactly
+        return self.loop != None and self.recorder == None
+
+    def RunInExecutor(self, function, *args):
+        # returns an awaitable of function(*args) run on the loading thread, for work such as loading fonts and images or building scenes that
+        # would stall a frame. Work is run one piece at a time in the order it was given. Only callable while RunAsync() is running
+        if self.executor == None:
+            self.executor = ThreadPoolExecutor(1, "loading")
+
+        return self.loop.run_in_executor(self.executor, function, *args)
+
+    def LoadSceneInExecutor(self, name, *args):
+        # returns an awaitable of the registered scene built on the loading thread. The load number its random streams are counted under
+        # is given out here, on the main thread, so that their seeds only depend on the order scenes are asked for
+        loadNumber = self.loadCount
+        self.loadCount += 1
+
+        return self.RunInExecutor(self.BuildLoadedScene, loadNumber, name, *args)
+
+    def BuildLoadedScene(self, loadNumber, name, *args):
+        # builds the registered scene on the loading thread, see LoadSceneInExecutor()
+        self.loadingStreams.prefix = "load {}".format(loadNumber)
+        self.loadingStreams.counts = {}
+
+        try:
+            return self.BuildScene(name, *args)
+        finally:
+            self.loadingStreams.prefix = None
+
+    def PreloadSceneAsync(self):
+        # starts building the next registered scene that should be preloaded on the loading thread, unless one is already being built
+        if not self.CanLoadAsync():
+            #while recording, scenes are preloaded between frames like Run() does
+            self.PreloadScene()
+            return
+
+        names = [name for name, registration in self.scenes.items() if registration.preload and registration.instance == None]
+        if names == [] or any(registration.loading != None for registration in self.scenes.values()):
+            return
+
+        registration = self.scenes[names[0]]
+        registration.loading = self.LoadSceneInExecutor(names[0])
+
+        def Loaded(future):
+            registration.loading = None
+            if not future.cancelled():
+                registration.instance = future.result()
+
+        registration.loading.add_done_callback(Loaded)
+
+    def LoadScene(self, newScene, *args):
+        # changes to newScene like ChangeScene(). While RunAsync() is running, a registered scene that has to be built is built on the loading
+        # thread, and a loading scene is shown until it is ready. Returns the task that changes the scene, or None if it was changed already
+        if type(newScene) is str and self.CanLoadAsync():
+            registration = self.scenes[newScene]
+
+            if registration.instance == None or registration.loading != None:
+                return self.loop.create_task(self.ChangeSceneAsync(newScene, *args))
+
+        self.ChangeScene(newScene, *args)
+        return None
+
+    async def ChangeSceneAsync(self, name, *args):
+        # changes to the registered scene, showing the loading scene while it is built on the loading thread. The scene is not changed to if
+        # another scene was changed to while it loaded. Returns the scene
+        registration = self.scenes[name]
+
+        if registration.instance == None or registration.loading != None:
+            if self.loadingScene == None:
+                self.loadingScene = self.loadingSceneFactory(self)
+
+            self.ChangeScene(self.loadingScene)
+            loadingScene = self.loadingScene
+
+            #a scene that is being preloaded is waited for instead of being built again
+            if registration.loading != None:
+                await asyncio.shield(registration.loading)
+
+            if registration.instance == None:
+                scene = await self.LoadSceneInExecutor(name, *args)
+            else:
+                scene = self.GetScene(name, *args)
+
+            if self.currentScene is loadingScene:
+                self.ChangeScene(scene)
+
+            return scene
+
+        self.ChangeScene(name, *args)
+        return self.currentScene
+
+
+    def UpdateScripts(self):
+        #runs the scripts of the current scene that are due this tick, see ScriptScheduler
+
+        if self.profiler.recording:
+            self.profiler.UpdateScripts(self.currentScene.scheduler)
+            return
+
+        self.currentScene.scheduler.Run()
+
+    def CastRigidBodies(self):
+        #casts the new position of each rigid body
+
+        if self.currentScene.physics != None:
+            self.currentScene.physics.Sync()
+            self.currentScene.physics.Cast()
+            return
+
+        for gameObject in self.currentScene.rigidBodyObjects:
+            gameObject.rigidBody.Cast()
+
+
+    def UpdateCollisions(self):
+        #sends each pair of enabled colliders that could collide to CheckForCollision(). Pairs of rigid bodies are found by the broadphase,
+        #rigid bodies are tested against static colliders (colliders without a rigid body) by querying the scene's static collider index,
+        #and pairs of static colliders are never tested. Pairs whose layers and masks do not match are skipped
+        scene = self.currentScene
+
+        if scene.physics != None:
+            scene.physics.UpdateCollisions()
+            scene.collidedObjects = scene.physics.collidedObjects
+            self.profiler.Count("collisionPairs", scene.physics.pairCount)
+            return
+
+        dynamicObjects = []
+
+        for gameObject in scene.colliderObjects:
+            gameObject.collider.collisions = []
+
+            rigidBody = gameObject.rigidBody
+            if rigidBody != None:
+                dynamicObjects.append(gameObject)
+                gameObject.collider.sweptContacts = []
+
+                if rigidBody.continuous:
+                    rigidBody.contactTime = 1
+                    rigidBody.contactNormal.Set(0, 0)
+
+        pairCount = 0
+        for primObj, secObj in self.broadphase.FindPairs(dynamicObjects):
+            if self.CanCollide(primObj.collider, secObj.collider):
+                self.CheckForCollision(primObj, secObj)
+                pairCount += 1
+
+        staticColliderIndex = scene.staticColliderIndex
+        if staticColliderIndex.dirty:
+            staticColliderIndex.Build(scene.gameObjects)
+
+        for primObj in dynamicObjects:
+            for secObj in staticColliderIndex.QueryBounds(*self.GetColliderBounds(primObj)):
+                if self.CanCollide(primObj.collider, secObj.collider):
+                    self.CheckForCollision(primObj, secObj)
+                    pairCount += 1
+
+        for gameObject in dynamicObjects:
+            if gameObject.collider.sweptContacts != []:
+                self.ResolveSweptContacts(gameObject)
+
+        #the game objects that collided with something, for UpdateContacts(). Static colliders are only hit by rigid bodies
+        collidedObjects = {}
+        for gameObject in dynamicObjects:
+            collisions = gameObject.collider.collisions
+            if collisions != []:
+                collidedObjects[gameObject] = None
+
+                for collider in collisions:
+                    collidedObjects[collider.parent] = None
+
+        scene.collidedObjects = list(collidedObjects)
+
+        self.profiler.Count("collisionPairs", pairCount)
+
+    @staticmethod
+    def CanCollide(primCollider, secCollider):
+        #colliders are only tested against each other if each one's layer is in the other's mask
+        return primCollider.layer & secCollider.mask != 0 and secCollider.layer & primCollider.mask != 0
+
+    @staticmethod
+    def GetColliderPosition(gameObject):
+        #returns the position the collider of a game object is tested at
+
+        if gameObject.rigidBody == None:
+            return gameObject.transform.position
+        else:
+            return gameObject.rigidBody.castPosition
+
+    @staticmethod
+    def GetColliderBounds(gameObject):
+        #returns (minX, minY, maxX, maxY) of the region the collider of a game object covers during the tick.
+        #Continuous rigid bodies cover the whole region they sweep through from their position to their cast position
+        size = gameObject.collider.size
+        rigidBody = gameObject.rigidBody
+
+        if rigidBody == None:
+            position = gameObject.transform.position
+            return (position.x, position.y, position.x + size.x, position.y + size.y)
+
+        end = rigidBody.castPosition
+        if not rigidBody.continuous:
+            return (end.x, end.y, end.x + size.x, end.y + size.y)
+
+        start = gameObject.transform.position
+        return (min(start.x, end.x), min(start.y, end.y), max(start.x, end.x) + size.x, max(start.y, end.y) + size.y)
+
+    @staticmethod
+    def CheckForCollision(primObj, secObj):
+        #checks if the casted rigid body(s) will collide and records the collision on both colliders
+
+        if (primObj.rigidBody != None and primObj.rigidBody.continuous) or (secObj.rigidBody != None and secObj.rigidBody.continuous):
+            GameManager.CheckForSweptCollision(primObj, secObj)
+            return
+
+        primPosition = GameManager.GetColliderPosition(primObj)
+        secPosition = GameManager.GetColliderPosition(secObj)
+
+        primSize = primObj.collider.size
+        secSize = secObj.collider.size
+
+        if primPosition.x < secPosition.x + secSize.x and primPosition.x + primSize.x > secPosition.x:
+            if primPosition.y < secPosition.y + secSize.y and primPosition.y + primSize.y > secPosition.y:
+                primObj.collider.collisions.append(secObj.collider)
+                secObj.collider.collisions.append(primObj.collider)
+
+
+    @staticmethod
+    def GetAxisOverlapTimes(primMin, primSize, secMin, secSize, displacement):
+        #returns the times between which two intervals overlap along one axis while the first moves by displacement relative to the second,
+        #or None if they never overlap. Intervals that only touch do not overlap
+        if displacement == 0:
+            if primMin < secMin + secSize and primMin + primSize > secMin:
+                return (-math.inf, math.inf)
+            return None
+
+        enter = (secMin - primMin - primSize) / displacement
+        exit = (secMin + secSize - primMin) / displacement
+
+        if enter > exit:
+            return (exit, enter)
+        return (enter, exit)
+
+    @staticmethod
+    def GetSweptContact(primObj, secObj):
+        #returns (time, normalX, normalY) of the first contact between the colliders of two game objects as they move from their positions
+        #to their cast positions during the tick, or None if they do not touch. Time is the fraction of the tick at which they touch
+        #and the normal points from the second collider towards the first. Colliders that already overlap and stay overlapping touch at time 0
+        primStart = primObj.transform.position
+        primEnd = GameManager.GetColliderPosition(primObj)
+        secStart = secObj.transform.position
+        secEnd = GameManager.GetColliderPosition(secObj)
+
+        primSize = primObj.collider.size
+        secSize = secObj.collider.size
+
+        #the first collider's movement relative to the second
+        dx = (primEnd.x - primStart.x) - (secEnd.x - secStart.x)
+        dy = (primEnd.y - primStart.y) - (secEnd.y - secStart.y)
+
+        xTimes = GameManager.GetAxisOverlapTimes(primStart.x, primSize.x, secStart.x, secSize.x, dx)
+        if xTimes == None:
+            return None
+        yTimes = GameManager.GetAxisOverlapTimes(primStart.y, primSize.y, secStart.y, secSize.y, dy)
+        if yTimes == None:
+            return None
+
+        enter = max(xTimes[0], yTimes[0])
+        exit = min(xTimes[1], yTimes[1])
+
+        if enter >= exit or enter >= 1 or exit <= 0:
+            return None
+
+        #colliders that overlap at the start only collide if they still overlap at the end, so touching colliders can move apart
+        if enter < 0:
+            if exit < 1:
+                return None
+            return (0, 0, 0)
+
+        if xTimes[0] > yTimes[0]:
+            return (enter, -1 if dx > 0 else 1, 0)
+        return (enter, 0, -1 if dy > 0 else 1)
+
+    @staticmethod
+    def CheckForSweptCollision(primObj, secObj):
+        #checks if the colliders touch at any time during the tick, and records the contact on the first collider. The collision is only
+        #recorded on both colliders by ResolveSweptContacts() once every pair has been tested.
+        #The earliest contact time and normal of each continuous rigid body are stored on it
+        contact = GameManager.GetSweptContact(primObj, secObj)
+        if contact == None:
+            return
+
+        contactTime, normalX, normalY = contact
+
+        primObj.collider.sweptContacts.append((contactTime, secObj.collider))
+
+        primRigidBody = primObj.rigidBody
+        if primRigidBody != None and primRigidBody.continuous and contactTime < primRigidBody.contactTime:
+            primRigidBody.contactTime = contactTime
+            primRigidBody.contactNormal.Set(normalX, normalY)
+
+        secRigidBody = secObj.rigidBody
+        if secRigidBody != None and secRigidBody.continuous and contactTime < secRigidBody.contactTime:
+            secRigidBody.contactTime = contactTime
+            secRigidBody.contactNormal.Set(-normalX, -normalY)
+
+    @staticmethod
+    def ResolveSweptContacts(gameObject):
+        #records the swept contacts of the game object's collider as collisions on both colliders. A continuous rigid body stops where it first
+        #touches a collider, so contacts later in the tick than a continuous rigid body's contact time are dropped, like a goal behind a paddle
+        for contactTime, other in gameObject.collider.sweptContacts:
+            rigidBody = gameObject.rigidBody
+            if rigidBody.continuous and contactTime > rigidBody.contactTime:
+                continue
+
+            otherRigidBody = other.parent.rigidBody
+            if otherRigidBody != None and otherRigidBody.continuous and contactTime > otherRigidBody.contactTime:
+                continue
+
+            gameObject.collider.collisions.append(other)
+            other.collisions.append(gameObject.collider)
+
+        gameObject.collider.sweptContacts = []
+
+    def MoveRigidBodies(self):
+        #moves rigid bodies to their casted positions if they have no collisions. Continuous rigid bodies that collided are moved
+        #to where they first touched
+
+        if self.currentScene.physics != None:
+            self.currentScene.physics.Move()
+            return
+
+        for gameObject in self.currentScene.rigidBodyObjects:
+            if gameObject.collider != None:
+                if gameObject.collider.collisions == []:
+                    gameObject.transform.position = gameObject.rigidBody.castPosition
+
+                elif gameObject.rigidBody.continuous and gameObject.rigidBody.contactTime > 0:
+                    rigidBody = gameObject.rigidBody
+                    position = gameObject.transform.position
+                    castPosition = rigidBody.castPosition
+                    castPosition.Set(position.x + (castPosition.x - position.x) * rigidBody.contactTime, position.y + (castPosition.y - position.y) * rigidBody.contactTime)
+                    gameObject.transform.position = castPosition
+
+            else:
+                gameObject.transform.position = gameObject.rigidBody.castPosition
+                gameObject.rigidBody.velocity.Set(0, 0)
+
+    def UpdateContacts(self):
+        #compares the colliders each game object touched this tick with those it touched last tick, and calls OnCollisionEnter(),
+        #OnCollisionStay(), and OnCollisionExit() on its scripts with the other collider. Only game objects that touched something are checked
+        scene = self.currentScene
+        touching = scene.touchingColliders
+        newTouching = {}
+
+        gameObjects = dict.fromkeys(scene.collidedObjects)
+        gameObjects.update(dict.fromkeys(touching))
+
+        for gameObject in gameObjects:
+            #colliders that were disabled, removed, or replaced stop touching
+            if gameObject in scene.colliderObjects:
+                collisions = gameObject.collider.collisions
+            else:
+                collisions = []
+
+            previous = touching.get(gameObject, ())
+
+            for collider in collisions:
+                if collider in previous:
+                    gameObject.OnCollisionStay(collider)
+                else:
+                    gameObject.OnCollisionEnter(collider)
+
+            if collisions != []:
+                newTouching[gameObject] = set(collisions)
+
+            for collider in previous:
+                if collider not in newTouching.get(gameObject, ()):
+                    gameObject.OnCollisionExit(collider)
+
+        scene.touchingColliders = newTouching
+
+    def InterpolateRigidBodies(self, alpha):
+        #sets the position each rigid body is drawn at to alpha of the way from its position before the last tick to its current position
+
+        if self.currentScene.physics != None:
+            self.currentScene.physics.Interpolate(alpha)
+            return
+
+        for gameObject in self.currentScene.rigidBodyObjects:
+            rigidBody = gameObject.rigidBody
+            position = gameObject.transform.position
+            previous = rigidBody.previousPosition
+            rigidBody.renderPosition.Set(previous.x + (position.x - previous.x) * alpha, previous.y + (position.y - previous.y) * alpha)
+
+    def UpdateWindow(self, alpha = 1):
+        #draws the scene's render list, which is kept sorted by layer, in one batch. Update graphics on screen.
+        #alpha is how far through the next tick the frame is drawn, rigid bodies are interpolated by it
+        if self.headless:
+            return
+
+        self.InterpolateRigidBodies(alpha)
+
+        if self.dirtyRectRendering:
+            self.UpdateDirtyRects()
+        else:
+            self.DrawScene(self.win)
+
+            if self.profiler.showOverlay:
+                self.win.blit(self.profiler.RenderOverlay(), (0, 0))
+
+            pyg.display.update()
+
+    def GetVisibleBlits(self):
+        #returns the sprites of the current scene that the camera can see in the order they are drawn, and the blits that draw them
+        #at their screen positions. Sprites are culled by querying the render list's spatial index with the camera's view
+        renderList = self.currentScene.renderList
+        camera = self.camera
+        position = camera.position
+
+        if camera.culling:
+            sprites = renderList.GetVisible(position.x, position.y, position.x + camera.size.x, position.y + camera.size.y)
+        else:
+            sprites = renderList.sprites
+
+        if position.x == 0 and position.y == 0:
+            if sprites is renderList.sprites:
+                return sprites, renderList.blits
+            return sprites, [sprite.renderBlit for sprite in sprites]
+
+        blits = []
+        for sprite in sprites:
+            blit = sprite.renderBlit
+            screenPosition = (blit[1].x - position.x, blit[1].y - position.y)
+
+            if len(blit) == 2:
+                blits.append((blit[0], screenPosition))
+            else:
+                blits.append((blit[0], screenPosition, blit[2]))
+
+        return sprites, blits
+
+    def GetDrawList(self):
+        #returns what is drawn this frame in order: the visible sprites and the static layers of the current scene, the blit that draws each,
+        #and whether the first blit covers the background. Each static layer is drawn by one blit of its composited surface, before the
+        #sprites on its layer that are not composited
+        sprites, blits = self.GetVisibleBlits()
+        staticLayers = self.currentScene.renderList.staticLayers
+
+        if staticLayers == {}:
+            return sprites, blits, False
+
+        drawables = list(sprites)
+        blits = list(blits)
+        keys = [sprite.renderKey for sprite in sprites]
+        covered = False
+
+        layers = sorted(layer for layer, staticLayer in staticLayers.items() if staticLayer.sprites != [])
+        for layer in reversed(layers):
+            staticLayer = staticLayers[layer]
+            index = bisect.bisect_left(keys, (layer,))
+
+            #the lowest static layer includes the background when nothing is drawn below it
+            if layer == layers[0] and index == 0:
+                image = staticLayer.Render(self.camera, self.winBGColour)
+                covered = True
+            else:
+                image = staticLayer.Render(self.camera, None)
+
+            drawables.insert(index, staticLayer)
+            blits.insert(index, (image, (0, 0)))
+
+        return drawables, blits, covered
+
+    def DrawScene(self, surface):
+        #draws the background and every sprite of the current scene that the camera can see to surface
+        drawables, blits, covered = self.GetDrawList()
+
+        if not covered:
+            surface.fill(self.winBGColour)
+        surface.blits(blits, doreturn=False)
+        self.profiler.Count("blits", len(blits))
+
+    def RenderOffscreen(self, alpha = 1):
+        # draws the current scene to an off-screen surface the size of the screen and returns it. Works in headless mode
+        if self.offscreen == None:
+            self.offscreen = pyg.Surface(self.screenSize.Tuple())
+
+        self.InterpolateRigidBodies(alpha)
+        self.DrawScene(self.offscreen)
+
+        return self.offscreen
+
+    def UpdateDirtyRects(self):
+        #compares the screen rect and image of each sprite with the last frame. Only the background and the sprites within
+        #the changed regions are redrawn, and only those regions are sent to the display
+        drawables, blits, covered = self.GetDrawList()
+        drawnSprites = {}
+        overlay = self.profiler.RenderOverlay() if self.profiler.showOverlay else None
+
+        #static layers are drawn as one surface, which is replaced whenever the layer is composited again
+        for drawable, blit in zip(drawables, blits):
+            drawnSprites[drawable] = (pyg.Rect((blit[1][0], blit[1][1]), drawable.GetSize()), blit[0], blit[2] if len(blit) == 3 else None)
+
+        if self.drawnScene is not self.currentScene or self.drawnBGColour != self.winBGColour:
+            dirtyRects = [self.win.get_rect()]
+        else:
+            dirtyRects = []
+
+            for drawable, drawn in drawnSprites.items():
+                previous = self.drawnSprites.get(drawable)
+
+                if previous == None:
+                    dirtyRects.append(drawn[0])
+                elif previous[0] != drawn[0] or previous[1] is not drawn[1] or previous[2] != drawn[2]:
+                    #a static layer that was composited again for the same view only changed where its sprites changed
+                    if type(drawable) is StaticLayer and drawable.changedRects != None and previous[0] == drawn[0]:
+                        dirtyRects.extend(drawable.changedRects)
+                    else:
+                        dirtyRects.append(drawn[0])
+                        dirtyRects.append(previous[0])
+
+            for drawable, previous in self.drawnSprites.items():
+                if drawable not in drawnSprites:
+                    dirtyRects.append(previous[0])
+
+            #the overlay is drawn over the sprites each frame, and where it was is redrawn once it is hidden
+            if overlay != None:
+                dirtyRects.append(self.profiler.overlayRect)
+            if self.drawnOverlayRect != None:
+                dirtyRects.append(self.drawnOverlayRect)
+
+            dirtyRects = self.MergeRects([rect.clip(self.win.get_rect()) for rect in dirtyRects])
+
+        blitCount = 0
+        for dirtyRect in dirtyRects:
+            #sprites that only partly overlap the region are clipped so that nothing outside it is drawn over
+            self.win.set_clip(dirtyRect)
+            if not covered:
+                self.win.fill(self.winBGColour, dirtyRect)
+
+            for drawable, blit in zip(drawables, blits):
+                if dirtyRect.colliderect(drawnSprites[drawable][0]):
+                    self.win.blit(*blit)
+                    blitCount += 1
+
+        self.win.set_clip(None)
+        self.profiler.Count("blits", blitCount)
+
+        if overlay != None:
+            self.win.blit(overlay, (0, 0))
+
+        if dirtyRects != []:
+            pyg.display.update(dirtyRects)
+
+        self.drawnSprites = drawnSprites
+        self.drawnScene = self.currentScene
+        self.drawnBGColour = self.winBGColour
+        self.drawnOverlayRect = self.profiler.overlayRect if overlay != None else None
+
+    @staticmethod
+    def MergeRects(rects):
+        #joins overlapping rects so that no region is redrawn twice. Empty rects are removed
+        merged = []
+
+        for rect in rects:
+            if rect.width == 0 or rect.height == 0:
+                continue
+
+            #keep absorbing merged rects until the joined rect no longer overlaps any of them
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+
+            merged.append(rect)
+
+        return merged
+
+        
+class FrameProfiler:
+    # low overhead profiler that is off until enabled. For each frame it records the time spent in each phase and in each script class,
+    # the number of collision pairs tested, the number of blits, and the change in allocated memory blocks and garbage collections.
+    # The most recent maxFrames frames are kept in a ring buffer
+
+    #phases reported by the overlay and summary, in pipeline order
+    phases = ["HandleEvents", "UpdateScripts", "CastRigidBodies", "UpdateCollisions", "MoveRigidBodies", "UpdateContacts", "UpdateWindow"]
+
+    def __init__(self, maxFrames = 300):
+        self.enabled = False
+        self.showOverlay = False
+        self.frames = deque(maxlen=maxFrames)
+        self.frameCount = 0
+
+        #frame being recorded, None between frames
+        self.frame = None
+        self.recording = False
+
+        self.overlayRect = pyg.Rect(0, 0, 0, 0)
+        self.overlayFont = "Courier New"
+        self.overlayTextSize = 16
+
+        #the overlay is only drawn again every overlayInterval seconds, onto the same surface
+        self.overlayInterval = 0.25
+        self.overlaySurface = None
+        self.overlayTime = 0
+
+    def BeginFrame(self):
+        # starts recording a frame. Called by GameManager.Run(), call it yourself when running the pipeline manually
+        if not self.enabled:
+            return
+
+        self.frame = {
+            "frame": self.frameCount,
+            "start": time.perf_counter(),
+            "duration": 0,
+            "phases": {},
+            "scripts": {},
+            "counts": {},
+            "events": [],
+            "allocatedBlocks": sys.getallocatedblocks(),
+            "gcCollections": sum(stats["collections"] for stats in gc.get_stats()),
+        }
+        self.recording = True
+
+    def EndFrame(self):
+        frame = self.frame
+        if frame == None:
+            return
+
+        frame["duration"] = time.perf_counter() - frame["start"]
+        frame["allocatedBlocks"] = sys.getallocatedblocks() - frame["allocatedBlocks"]
+        frame["gcCollections"] = sum(stats["collections"] for stats in gc.get_stats()) - frame["gcCollections"]
+
+        self.frames.append(frame)
+        self.frameCount += 1
+        self.frame = None
+        self.recording = False
+
+    def AddPhase(self, name, start):
+        # adds the time since start to the phase and returns the current time so phases can be chained
+        end = time.perf_counter()
+
+        if self.recording:
+            phases = self.frame["phases"]
+            phases[name] = phases.get(name, 0) + end - start
+            self.frame["events"].append((name, start, end - start))
+
+        return end
+
+    def Count(self, name, amount = 1):
+        if self.recording:
+            counts = self.frame["counts"]
+            counts[name] = counts.get(name, 0) + amount
+
+    def UpdateScripts(self, scheduler):
+        # runs the scheduler like GameManager.UpdateScripts() while timing each script class.
+        # Game objects that override Update() are timed as a whole under their own class name
+        scheduler.Run(self.frame["scripts"])
+
+    def GetSummary(self):
+        # returns the mean and worst time in ms of each phase and script class, and the mean of each count, over the recorded frames
+        summary = {"frames": len(self.frames), "phases": {}, "scripts": {}, "counts": {}}
+        if len(self.frames) == 0:
+            return summary
+
+        for key in ("phases", "scripts", "counts"):
+            totals = {}
+            worst = {}
+
+            for frame in self.frames:
+                for name, value in frame[key].items():
+                    totals[name] = totals.get(name, 0) + value
+                    worst[name] = max(worst.get(name, 0), value)
+
+            for name in totals:
+                if key == "counts":
+                    summary[key][name] = totals[name] / len(self.frames)
+                else:
+                    summary[key][name] = {"meanMs": totals[name] / len(self.frames) * 1000, "maxMs": worst[name] * 1000}
+
+        durations = [frame["duration"] for frame in self.frames]
+        summary["frameMeanMs"] = sum(durations) / len(durations) * 1000
+        summary["frameMaxMs"] = max(durations) * 1000
+        summary["allocatedBlocksPerFrame"] = sum(frame["allocatedBlocks"] for frame in self.frames) / len(self.frames)
+        summary["gcCollectionsPerFrame"] = sum(frame["gcCollections"] for frame in self.frames) / len(self.frames)
+
+        return summary
+
+    def ToJSON(self, path = None):
+        # returns the recorded frames and summary as a JSON string, and writes it to path if given
+        data = {
+            "summary": self.GetSummary(),
+            "frames": [{key: value for key, value in frame.items() if key != "events"} for frame in self.frames],
+        }
+        text = json.dumps(data, indent=1)
+
+        if path != None:
+            with open(path, "w") as file:
+                file.write(text)
+
+        return text
+
+    def ToChromeTrace(self, path):
+        # writes the recorded frames in the Chrome trace event format, which can be opened in chrome://tracing or Perfetto
+        events = []
+
+        for frame in self.frames:
+            args = {"frame": frame["frame"], "allocatedBlocks": frame["allocatedBlocks"], "gcCollections": frame["gcCollections"]}
+            args.update(frame["counts"])
+            args.update({"script " + name: duration * 1000 for name, duration in frame["scripts"].items()})
+
+            events.append({"name": "Frame", "ph": "X", "pid": 0, "tid": 0, "ts": frame["start"] * 1e6, "dur": frame["duration"] * 1e6, "args": args})
+
+            for name, start, duration in frame["events"]:
+                events.append({"name": name, "ph": "X", "pid": 0, "tid": 0, "ts": start * 1e6, "dur": duration * 1e6})
+
+            if frame["counts"] != {}:
+                events.append({"name": "Counts", "ph": "C", "pid": 0, "tid": 0, "ts": frame["start"] * 1e6, "args": frame["counts"]})
+
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def RenderOverlay(self):
+        # returns a surface showing the mean phase times and counts of the recorded frames. The surface is only updated every
+        # overlayInterval seconds, so that summarising the frames does not add much to the frame times it shows
+        now = time.perf_counter()
+        if self.overlaySurface != None and now - self.overlayTime < self.overlayInterval:
+            return self.overlaySurface
+
+        self.overlayTime = now
+        summary = self.GetSummary()
+        lines = ["frame {:.2f} ms".format(summary.get("frameMeanMs", 0))]
+
+        for name in FrameProfiler.phases:
+            if name in summary["phases"]:
+                lines.append("{:<17}{:.2f} ms".format(name, summary["phases"][name]["meanMs"]))
+
+        for name, value in summary["counts"].items():
+            lines.append("{:<17}{:.0f}".format(name, value))
+
+        #overlay text changes each time it is drawn, so it is not put in the text cache
+        font = textCache.GetFont(self.overlayFont, self.overlayTextSize)
+        lineHeight = font.get_linesize()
+        size = (260, lineHeight * len(lines) + 8)
+
+        surface = self.overlaySurface
+        if surface == None or surface.get_size() != size:
+            surface = pyg.Surface(size)
+            self.overlaySurface = surface
+        surface.fill(Colour.black)
+
+        for i, line in enumerate(lines):
+            surface.blit(textCache.RenderUncached(line, self.overlayFont, self.overlayTextSize, Colour.white), (4, 4 + i * lineHeight))
+
+        self.overlayRect = surface.get_rect()
+        return surface
+
+
+class Camera:
+    # the region of the world drawn to the window. position is the world position drawn at the top left of the window and size is
+    # the size of the region. Sprites outside the region are not drawn when culling is enabled
+
+    def __init__(self, size):
+        self.position = Vector2(0, 0)
+        self.size = size
+        self.culling = True
+
+    def WorldToScreen(self, position):
+        return Vector2(position.x - self.position.x, position.y - self.position.y)
+
+    def ScreenToWorld(self, position):
+        return Vector2(position.x + self.position.x, position.y + self.position.y)
+
+
+class InputManager:
+    # turns pygame events into actions and mouse clicks. Keys are bound to named actions, and callbacks subscribed to an action are
+    # called with (action, pressed) when it is pressed or released. Clicks are sent to the UI elements under the mouse found through
+    # the current scene's UIIndex, so UI elements do nothing on frames without input
+
+    def __init__(self, gameManager):
+        self.gameManager = gameManager
+
+        #key: action, and action: whether it is held
+        self.bindings = {}
+        self.actions = {}
+
+        #action: callbacks, and pygame event type: callbacks called with the event
+        self.callbacks = {}
+        self.eventCallbacks = {}
+
+        self.mousePos = Vector2.Zero()
+        self.mouseDown = False
+
+        #UI elements pressed by the last click. They are released when the mouse button is released
+        self.pressedElements = []
+
+    def Bind(self, action, key):
+        # pressing key presses action. An action can be bound to more than one key
+        self.bindings[key] = action
+        self.actions.setdefault(action, False)
+
+    def Unbind(self, key):
+        self.bindings.pop(key, None)
+
+    def IsDown(self, action):
+        return self.actions.get(action, False)
+
+    def Subscribe(self, action, callback):
+        # callback(action, pressed) is called when action is pressed or released
+        self.callbacks.setdefault(action, []).append(callback)
+
+    def Unsubscribe(self, action, callback):
+        self.callbacks[action].remove(callback)
+
+    def SubscribeEvent(self, eventType, callback):
+        # callback(event) is called with each pygame event of eventType
+        self.eventCallbacks.setdefault(eventType, []).append(callback)
+
+    def UnsubscribeEvent(self, eventType, callback):
+        self.eventCallbacks[eventType].remove(callback)
+
+    def SetAction(self, action, pressed):
+        # presses or releases action, calling its callbacks if it changed
+        if self.actions.get(action, False) == pressed:
+            return
+
+        self.actions[action] = pressed
+        #callbacks can unsubscribe themselves, so a copy is iterated
+        for callback in list(self.callbacks.get(action, ())):
+            callback(action, pressed)
+
+    def HandleEvent(self, event):
+        for callback in list(self.eventCallbacks.get(event.type, ())):
+            callback(event)
+
+        if event.type == pyg.KEYDOWN or event.type == pyg.KEYUP:
+            action = self.bindings.get(event.key)
+            if action != None:
+                self.SetAction(action, event.type == pyg.KEYDOWN)
+
+        elif event.type == pyg.MOUSEMOTION:
+            self.mousePos.Set(*event.pos)
+
+        elif event.type == pyg.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                self.mousePos.Set(*event.pos)
+                self.mouseDown = True
+                self.PressElements()
+
+        elif event.type == pyg.MOUSEBUTTONUP:
+            if event.button == 1:
+                self.mousePos.Set(*event.pos)
+                self.mouseDown = False
+                self.ReleaseElements()
+
+    def PressElements(self):
+        # presses each UI element of the current scene under the mouse
+        scene = self.gameManager.currentScene
+        if scene == None:
+            return
+
+        for element in scene.uiIndex.Query(self.gameManager.camera.ScreenToWorld(self.mousePos)):
+            if element not in self.pressedElements:
+                self.pressedElements.append(element)
+                element.OnMouseDown()
+
+    def ReleaseElements(self):
+        # releases the pressed UI elements. Elements that are no longer in the current scene are released outside of themselves
+        pressedElements = self.pressedElements
+        self.pressedElements = []
+        scene = self.gameManager.currentScene
+
+        mouseWorldPos = self.gameManager.camera.ScreenToWorld(self.mousePos)
+
+        for element in pressedElements:
+            inside = element.inScene and element.scene is scene and element.Contains(mouseWorldPos)
+            element.OnMouseUp(inside)
+
+
+class UIIndex:
+    # spatial hash of the UI elements of a scene, like buttons, so that a click only tests the elements near it.
+    # UI elements have Contains(position), OnMouseDown(), and OnMouseUp(inside). The index is rebuilt when an element moves
+
+    def __init__(self, cellSize = 100):
+        self.cellSize = cellSize
+
+        #element: None, kept in the order the elements were added
+        self.elements = {}
+        self.cells = {}
+        self.dirty = True
+
+    def Add(self, element):
+        self.elements[element] = None
+        element.inUIIndex = True
+        self.dirty = True
+
+    def Remove(self, element):
+        self.elements.pop(element, None)
+        element.inUIIndex = False
+        self.dirty = True
+
+    def Invalidate(self):
+        self.dirty = True
+
+    def Build(self):
+        cellSize = self.cellSize
+        self.cells = {}
+
+        for element in self.elements:
+            position = element.transform.position
+            size = element.size
+
+            for cellX in range(int(position.x // cellSize), int((position.x + size.x) // cellSize) + 1):
+                for cellY in range(int(position.y // cellSize), int((position.y + size.y) // cellSize) + 1):
+                    self.cells.setdefault((cellX, cellY), []).append(element)
+
+        self.dirty = False
+
+    def Query(self, position):
+        # returns the elements in the scene that contain position
+        if self.dirty:
+            self.Build()
+
+        cell = (int(position.x // self.cellSize), int(position.y // self.cellSize))
+        return [element for element in self.cells.get(cell, ()) if element.inScene and element.Contains(position)]
+
+
+class InputRecording:
+    # the input of a session: the seed and screen size of the game manager, the names of its actions, and each change of the held
+    # actions or the mouse button with the tick it was applied before. Checksums of the scene are stored every few ticks so that a
+    # replay can check it matches. Saved as a compact binary file of variable length integers
+
+    magic = b"PGIR"
+    version = 1
+
+    #kinds of record, each stored as (tick, kind, values)
+    actionsChanged = 0
+    mouseDown = 1
+    mouseUp = 2
+    checksum = 3
+
+    def __init__(self, seed, screenSize, actions):
+        self.seed = seed
+        self.screenSize = screenSize
+        self.actions = actions
+        self.records = []
+
+    @staticmethod
+    def WriteVarint(data, value):
+        # appends value to data 7 bits at a time, the high bit of each byte is set if more bytes follow
+        while value >= 0x80:
+            data.append(value & 0x7F | 0x80)
+            value >>= 7
+        data.append(value)
+
+    @staticmethod
+    def ReadVarint(data, index):
+        # returns the value starting at index and the index after it
+        value = 0
+        shift = 0
+
+        while True:
+            byte = data[index]
+            index += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+            if byte < 0x80:
+                return value, index
+
+    def ToBytes(self):
+        data = bytearray(InputRecording.magic)
+        write = InputRecording.WriteVarint
+
+        for value in (InputRecording.version, self.seed, int(self.screenSize.x), int(self.screenSize.y), len(self.actions)):
+            write(data, value)
+
+        for action in self.actions:
+            name = action.encode()
+            write(data, len(name))
+            data.extend(name)
+
+        #ticks are stored as the number of ticks since the previous record
+        previousTick = 0
+        for tick, kind, values in self.records:
+            write(data, tick - previousTick)
+            data.append(kind)
+            for value in values:
+                write(data, value)
+
+            previousTick = tick
+
+        return bytes(data)
+
+    @staticmethod
+    def FromBytes(data):
+        if data[:4] != InputRecording.magic:
+            raise ValueError("not an input recording")
+
+        read = InputRecording.ReadVarint
+        values = []
+        index = 4
+        for _ in range(5):
+            value, index = read(data, index)
+            values.append(value)
+
+        version, seed, width, height, actionCount = values
+        if version != InputRecording.version:
+            raise ValueError("unsupported input recording version {}".format(version))
+
+        actions = []
+        for _ in range(actionCount):
+            length, index = read(data, index)
+            actions.append(data[index:index + length].decode())
+            index += length
+
+        recording = InputRecording(seed, Vector2(width, height), actions)
+
+        #number of values stored with each kind of record
+        valueCounts = {InputRecording.actionsChanged: 1, InputRecording.mouseDown: 2, InputRecording.mouseUp: 2, InputRecording.checksum: 1}
+
+        tick = 0
+        while index < len(data):
+            delta, index = read(data, index)
+            tick += delta
+            kind = data[index]
+            index += 1
+
+            recordValues = []
+            for _ in range(valueCounts[kind]):
+                value, index = read(data, index)
+                recordValues.append(value)
+
+            recording.records.append((tick, kind, tuple(recordValues)))
+
+        return recording
+
+    def Save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.ToBytes())
+
+    @staticmethod
+    def Load(path):
+        with open(path, "rb") as file:
+            return InputRecording.FromBytes(file.read())
+
+
+class InputRecorder:
+    # records the input of a game manager into an InputRecording while it runs. Actions must be bound before recording starts
+
+    #ticks between checksums of the scene
+    checksumInterval = 30
+
+    def __init__(self, gameManager):
+        self.gameManager = gameManager
+        self.recording = InputRecording(gameManager.seed, gameManager.screenSize, sorted(gameManager.input.actions))
+
+        inputManager = gameManager.input
+        for action in self.recording.actions:
+            inputManager.Subscribe(action, self.OnAction)
+        inputManager.SubscribeEvent(pyg.MOUSEBUTTONDOWN, self.OnMouseButton)
+        inputManager.SubscribeEvent(pyg.MOUSEBUTTONUP, self.OnMouseButton)
+
+        gameManager.recorder = self
+
+    def OnAction(self, action, pressed):
+        #the state of every action is stored as one bit mask
+        held = 0
+        for index, name in enumerate(self.recording.actions):
+            if self.gameManager.input.IsDown(name):
+                held |= 1 << index
+
+        self.recording.records.append((self.gameManager.tick, InputRecording.actionsChanged, (held,)))
+
+    def OnMouseButton(self, event):
+        if event.button == 1:
+            kind = InputRecording.mouseDown if event.type == pyg.MOUSEBUTTONDOWN else InputRecording.mouseUp
+            self.recording.records.append((self.gameManager.tick, kind, (int(event.pos[0]), int(event.pos[1]))))
+
+    def AfterTick(self):
+        if self.gameManager.tick % InputRecorder.checksumInterval == 0:
+            self.Checksum()
+
+    def Checksum(self):
+        self.recording.records.append((self.gameManager.tick, InputRecording.checksum, (self.gameManager.GetStateChecksum(),)))
+
+    def Stop(self):
+        # stops recording and returns the recording. A final checksum is stored so the replay runs to the last recorded tick
+        inputManager = self.gameManager.input
+        for action in self.recording.actions:
+            inputManager.Unsubscribe(action, self.OnAction)
+        inputManager.UnsubscribeEvent(pyg.MOUSEBUTTONDOWN, self.OnMouseButton)
+        inputManager.UnsubscribeEvent(pyg.MOUSEBUTTONUP, self.OnMouseButton)
+
+        self.Checksum()
+        self.gameManager.recorder = None
+
+        return self.recording
+
+
+class Broadphase:
+    # base class for broadphases. Finds the pairs of game objects whose colliders could overlap so that only those pairs are tested by CheckForCollision()
+
+    def FindPairs(self, gameObjects):
+        # returns each unordered pair of game objects that could be colliding. All game objects passed in have an enabled collider
+        pairs = []
+
+        for i in range(len(gameObjects)):
+            for j in range(i + 1, len(gameObjects)):
+                pairs.append((gameObjects[i], gameObjects[j]))
+
+        return pairs
+
+
+class SpatialHashBroadphase(Broadphase):
+    # places each collider in the cells of a uniform grid that it covers. Only game objects that share a cell are paired
+
+    def __init__(self, cellSize = 100):
+        self.cellSize = cellSize
+
+    def FindPairs(self, gameObjects):
+        cellSize = self.cellSize
+        cells = {}
+        pairs = []
+
+        #a pair of large colliders can share several cells, so pairs already found are skipped
+        foundPairs = set()
+
+        for index, gameObject in enumerate(gameObjects):
+            bounds = GameManager.GetColliderBounds(gameObject)
+
+            minX = int(bounds[0] // cellSize)
+            maxX = int(bounds[2] // cellSize)
+            minY = int(bounds[1] // cellSize)
+            maxY = int(bounds[3] // cellSize)
+
+            for cellX in range(minX, maxX + 1):
+                for cellY in range(minY, maxY + 1):
+                    cell = cells.get((cellX, cellY))
+
+                    if cell == None:
+                        cells[(cellX, cellY)] = [index]
+                        continue
+
+                    for otherIndex in cell:
+                        if (otherIndex, index) not in foundPairs:
+                            foundPairs.add((otherIndex, index))
+                            pairs.append((gameObjects[otherIndex], gameObject))
+
+                    cell.append(index)
+
+        return pairs
+
+
+class StaticColliderIndex:
+    # bounding volume hierarchy of the colliders in a scene that have no rigid body. It is only rebuilt after it has been invalidated
+    # by adding or removing a game object, attaching a collider or rigid body, or moving a static collider's transform
+
+    #maximum number of colliders stored in a leaf node
+    leafSize = 4
+
+    def __init__(self):
+        self.dirty = True
+        self.root = None
+
+    def Invalidate(self):
+        self.dirty = True
+
+    def Build(self, gameObjects):
+        # rebuilds the hierarchy from the static colliders in gameObjects
+        entries = []
+
+        for gameObject in gameObjects:
+            if gameObject.collider != None and gameObject.rigidBody == None:
+                position = gameObject.transform.position
+                size = gameObject.collider.size
+                entries.append((position.x, position.y, position.x + size.x, position.y + size.y, gameObject))
+
+        if entries == []:
+            self.root = None
+        else:
+            self.root = self.BuildNode(entries)
+
+        self.dirty = False
+
+    def BuildNode(self, entries):
+        # nodes are stored as (minX, minY, maxX, maxY, entries, children). Leaf nodes have no children and branch nodes have no entries
+
+        minX = min(entry[0] for entry in entries)
+        minY = min(entry[1] for entry in entries)
+        maxX = max(entry[2] for entry in entries)
+        maxY = max(entry[3] for entry in entries)
+
+        if len(entries) <= StaticColliderIndex.leafSize:
+            return (minX, minY, maxX, maxY, entries, None)
+
+        #split the entries in half along the longest axis of the node
+        if maxX - minX >= maxY - minY:
+            entries.sort(key=lambda entry: entry[0] + entry[2])
+        else:
+            entries.sort(key=lambda entry: entry[1] + entry[3])
+
+        middle = len(entries) // 2
+        children = (self.BuildNode(entries[:middle]), self.BuildNode(entries[middle:]))
+
+        return (minX, minY, maxX, maxY, None, children)
+
+    def Query(self, position, size):
+        # returns the game objects with an enabled static collider that overlap the box at position with the given size
+        return self.QueryBounds(position.x, position.y, position.x + size.x, position.y + size.y)
+
+    def QueryBounds(self, minX, minY, maxX, maxY):
+        # returns the game objects with an enabled static collider that overlap the box from (minX, minY) to (maxX, maxY)
+        found = []
+
+        if self.root == None:
+            return found
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+
+            if node[0] < maxX and node[2] > minX and node[1] < maxY and node[3] > minY:
+                if node[5] == None:
+                    for entry in node[4]:
+                        if entry[0] < maxX and entry[2] > minX and entry[1] < maxY and entry[3] > minY:
+                            if entry[4].collider.enabled:
+                                found.append(entry[4])
+                else:
+                    stack.extend(node[5])
+
+        return found
+
+
+class ArrayPhysics:
+    # optional physics backend that stores the positions, velocities, cast positions, and collider sizes of a scene in numpy arrays.
+    # Casting, collision detection, and moving are each done as one batched array operation instead of one Vector2 at a time.
+    # The transform position, velocity, and cast position of each physics object are ArrayVector2 views into the arrays,
+    # so scripts can keep reading and assigning them. Collider sizes are copied when the arrays are rebuilt
+
+    def __init__(self, scene):
+        if numpy == None:
+            raise ImportError("ArrayPhysics requires numpy")
+
+        self.scene = scene
+
+        #game objects with a rigid body or collider, in row order
+        self.gameObjects = []
+        self.rows = {}
+
+        self.positions = numpy.zeros((0, 2))
+        self.velocities = numpy.zeros((0, 2))
+        self.castPositions = numpy.zeros((0, 2))
+        self.previousPositions = numpy.zeros((0, 2))
+        self.renderPositions = numpy.zeros((0, 2))
+        self.sizes = numpy.zeros((0, 2))
+        self.isDynamic = numpy.zeros(0, dtype=bool)
+        self.hasCollider = numpy.zeros(0, dtype=bool)
+        self.colliderEnabled = numpy.zeros(0, dtype=bool)
+        self.layers = numpy.zeros(0, dtype=numpy.int64)
+        self.masks = numpy.zeros(0, dtype=numpy.int64)
+        self.collisionCounts = numpy.zeros(0, dtype=int)
+
+        #colliders whose collisions[] was filled last frame and must be cleared
+        self.collidedObjects = []
+
+        #number of candidate pairs tested in the last update
+        self.pairCount = 0
+
+        #set when a collider is enabled or disabled, or its layer or mask changes
+        self.dirty = True
+        self.enabledDirty = True
+
+    def Invalidate(self):
+        # rebuilds the arrays before the next physics update
+        self.dirty = True
+
+    def Sync(self):
+        # rebuilds the arrays if physics objects have been added to or removed from the scene
+        if self.dirty:
+            self.Rebuild()
+
+        if self.enabledDirty:
+            for row, gameObject in enumerate(self.gameObjects):
+                collider = gameObject.collider
+                self.colliderEnabled[row] = collider != None and collider.enabled
+
+                if collider != None:
+                    self.layers[row] = collider.layer
+                    self.masks[row] = collider.mask
+
+            self.enabledDirty = False
+
+    def Rebuild(self):
+        gameObjects = [gameObject for gameObject in self.scene.gameObjects if gameObject.collider != None or gameObject.rigidBody != None]
+        count = len(gameObjects)
+
+        #copy the current values out of the old arrays before they are replaced
+        for gameObject in self.gameObjects:
+            self.Unbind(gameObject)
+
+        self.gameObjects = gameObjects
+        self.rows = {}
+
+        self.positions = numpy.zeros((count, 2))
+        self.velocities = numpy.zeros((count, 2))
+        self.castPositions = numpy.zeros((count, 2))
+        self.previousPositions = numpy.zeros((count, 2))
+        self.renderPositions = numpy.zeros((count, 2))
+        self.sizes = numpy.zeros((count, 2))
+        self.isDynamic = numpy.zeros(count, dtype=bool)
+        self.hasCollider = numpy.zeros(count, dtype=bool)
+        self.colliderEnabled = numpy.zeros(count, dtype=bool)
+        self.layers = numpy.zeros(count, dtype=numpy.int64)
+        self.masks = numpy.zeros(count, dtype=numpy.int64)
+        self.collisionCounts = numpy.zeros(count, dtype=int)
+
+        for row, gameObject in enumerate(gameObjects):
+            self.rows[gameObject] = row
+
+            position = gameObject.transform.position
+            self.positions[row] = (position.x, position.y)
+            gameObject.transform._position = ArrayVector2(self.positions, row)
+
+            rigidBody = gameObject.rigidBody
+            if rigidBody != None:
+                self.isDynamic[row] = True
+                self.velocities[row] = (rigidBody.velocity.x, rigidBody.velocity.y)
+                self.castPositions[row] = (rigidBody.castPosition.x, rigidBody.castPosition.y)
+                self.previousPositions[row] = (rigidBody.previousPosition.x, rigidBody.previousPosition.y)
+                self.renderPositions[row] = (rigidBody.renderPosition.x, rigidBody.renderPosition.y)
+                rigidBody._velocity = ArrayVector2(self.velocities, row)
+                rigidBody._castPosition = ArrayVector2(self.castPositions, row)
+                rigidBody.previousPosition = ArrayVector2(self.previousPositions, row)
+                rigidBody.renderPosition = ArrayVector2(self.renderPositions, row)
+
+            self.scene.renderList.Refresh(gameObject.sprite)
+
+            collider = gameObject.collider
+            if collider != None:
+                self.hasCollider[row] = True
+                self.sizes[row] = (collider.size.x, collider.size.y)
+
+        self.dirty = False
+        self.enabledDirty = True
+
+    def Unbind(self, gameObject):
+        # replaces the array views of a game object with plain vectors holding the same values
+        transform = gameObject.transform
+        if type(transform._position) is ArrayVector2:
+            transform._position = TransformVector2(transform, transform._position.x, transform._position.y)
+
+        rigidBody = gameObject.rigidBody
+        if rigidBody != None:
+            if type(rigidBody._velocity) is ArrayVector2:
+                rigidBody._velocity = Vector2(rigidBody._velocity.x, rigidBody._velocity.y)
+            if type(rigidBody._castPosition) is ArrayVector2:
+                rigidBody._castPosition = Vector2(rigidBody._castPosition.x, rigidBody._castPosition.y)
+            if type(rigidBody.previousPosition) is ArrayVector2:
+                rigidBody.previousPosition = Vector2(rigidBody.previousPosition.x, rigidBody.previousPosition.y)
+            if type(rigidBody.renderPosition) is ArrayVector2:
+                rigidBody.renderPosition = Vector2(rigidBody.renderPosition.x, rigidBody.renderPosition.y)
+
+        gameObject.scene.renderList.Refresh(gameObject.sprite)
+
+    def Cast(self):
+        numpy.copyto(self.previousPositions, self.positions)
+
+        #static rows have no velocity, so their cast position is their position
+        numpy.add(self.positions, self.velocities, out=self.castPositions)
+
+    def Interpolate(self, alpha):
+        numpy.subtract(self.positions, self.previousPositions, out=self.renderPositions)
+        self.renderPositions *= alpha
+        self.renderPositions += self.previousPositions
+
+    def FindPairs(self):
+        # sweep and prune on the sorted x intervals of the enabled colliders. Returns the rows of each overlapping pair that has a rigid body
+        # and whose layers and masks match
+
+        active = numpy.flatnonzero(self.hasCollider & self.colliderEnabled)
+        if len(active) < 2:
+            self.pairCount = 0
+            return active[:0], active[:0]
+
+        minX = self.castPositions[active, 0]
+        order = numpy.argsort(minX, kind="stable")
+        active = active[order]
+        minX = minX[order]
+        maxX = minX + self.sizes[active, 0]
+
+        #every interval after i that starts before interval i ends is a candidate
+        ends = numpy.searchsorted(minX, maxX, side="left")
+        starts = numpy.arange(1, len(active) + 1)
+        counts = numpy.maximum(ends - starts, 0)
+
+        first = numpy.repeat(numpy.arange(len(active)), counts)
+        offsets = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        second = first + 1 + offsets
+
+        primRows = active[first]
+        secRows = active[second]
+        self.pairCount = len(primRows)
+
+        primPositions = self.castPositions[primRows]
+        secPositions = self.castPositions[secRows]
+        primSizes = self.sizes[primRows]
+        secSizes = self.sizes[secRows]
+
+        overlapping = ((primPositions[:, 0] < secPositions[:, 0] + secSizes[:, 0]) & (primPositions[:, 0] + primSizes[:, 0] > secPositions[:, 0])
+                       & (primPositions[:, 1] < secPositions[:, 1] + secSizes[:, 1]) & (primPositions[:, 1] + primSizes[:, 1] > secPositions[:, 1])
+                       & (self.isDynamic[primRows] | self.isDynamic[secRows])
+                       & (self.layers[primRows] & self.masks[secRows] != 0) & (self.layers[secRows] & self.masks[primRows] != 0))
+
+        return primRows[overlapping], secRows[overlapping]
+
+    def UpdateCollisions(self):
+        for gameObject in self.collidedObjects:
+            gameObject.collider.collisions = []
+
+        primRows, secRows = self.FindPairs()
+
+        self.collisionCounts = numpy.bincount(primRows, minlength=len(self.gameObjects)) + numpy.bincount(secRows, minlength=len(self.gameObjects))
+
+        gameObjects = self.gameObjects
+        for primRow, secRow in zip(primRows.tolist(), secRows.tolist()):
+            primObj = gameObjects[primRow]
+            secObj = gameObjects[secRow]
+            primObj.collider.collisions.append(secObj.collider)
+            secObj.collider.collisions.append(primObj.collider)
+
+        self.collidedObjects = [gameObjects[row] for row in numpy.flatnonzero(self.collisionCounts).tolist()]
+
+    def Move(self):
+        #rigid bodies without a collider always move and then stop, rigid bodies with a collider only move if nothing was hit
+        moving = self.isDynamic & (self.collisionCounts == 0)
+        self.positions[moving] = self.castPositions[moving]
+        self.velocities[self.isDynamic & ~self.hasCollider] = 0
+
+
+class SpriteIndex:
+    # uniform grid of the screen rects of sprites that do not move on their own, used to find the sprites in a region without testing every sprite
+
+    def __init__(self, cellSize = 256):
+        self.cellSize = cellSize
+
+        #cell: {sprite: None}, and sprite: (minX, minY, maxX, maxY) of its rect
+        self.cells = {}
+        self.rects = {}
+
+    def Add(self, sprite, position, size):
+        rect = (position.x, position.y, position.x + size[0], position.y + size[1])
+        self.rects[sprite] = rect
+
+        for cell in self.GetCells(rect):
+            self.cells.setdefault(cell, {})[sprite] = None
+
+    def Remove(self, sprite):
+        rect = self.rects.pop(sprite, None)
+        if rect == None:
+            return
+
+        for cell in self.GetCells(rect):
+            cellSprites = self.cells[cell]
+            del cellSprites[sprite]
+
+            if cellSprites == {}:
+                del self.cells[cell]
+
+    def GetCells(self, rect):
+        cellSize = self.cellSize
+        return [(cellX, cellY) for cellX in range(int(rect[0] // cellSize), int(rect[2] // cellSize) + 1)
+                for cellY in range(int(rect[1] // cellSize), int(rect[3] // cellSize) + 1)]
+
+    def Query(self, minX, minY, maxX, maxY, found):
+        # adds the sprites whose rect overlaps the region to the dict found. Sprites in cells that are inside the region are not tested
+        cellSize = self.cellSize
+        rects = self.rects
+
+        minCellX = int(minX // cellSize)
+        maxCellX = int(maxX // cellSize)
+        minCellY = int(minY // cellSize)
+        maxCellY = int(maxY // cellSize)
+
+        #if the grid is smaller than the region only its cells are visited
+        if (maxCellX - minCellX + 1) * (maxCellY - minCellY + 1) > len(self.cells):
+            cells = [cell for cell in self.cells if minCellX <= cell[0] <= maxCellX and minCellY <= cell[1] <= maxCellY]
+        else:
+            cells = [(cellX, cellY) for cellX in range(minCellX, maxCellX + 1) for cellY in range(minCellY, maxCellY + 1)]
+
+        for cell in cells:
+            cellSprites = self.cells.get(cell)
+            if cellSprites == None:
+                continue
+
+            if cell[0] * cellSize >= minX and (cell[0] + 1) * cellSize <= maxX and cell[1] * cellSize >= minY and (cell[1] + 1) * cellSize <= maxY:
+                found.update(cellSprites)
+                continue
+
+            for sprite in cellSprites:
+                rect = rects[sprite]
+                if rect[0] < maxX and rect[2] > minX and rect[1] < maxY and rect[3] > minY:
+                    found[sprite] = None
+
+
+class StaticLayer:
+    # the sprites on a render layer marked as static, composited into one surface the size of the camera's view. The surface is only
+    # composited again when one of the sprites is added, removed, changed, or moved, or the camera moves. Sprites of rigid bodies move
+    # every tick, so they are never composited and are drawn after the layer's surface
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.keys = []
+        self.sprites = []
+        self.index = SpriteIndex()
+
+        self.surface = None
+        self.dirty = True
+        self.drawnView = None
+        self.drawnBGColour = None
+
+        #world rects of the sprites changed since the surface was composited, and the screen rects that changed when it was last composited.
+        #changedRects is None when the whole surface changed
+        self.dirtyRects = []
+        self.changedRects = None
+
+    def Add(self, sprite):
+        index = bisect.bisect_left(self.keys, sprite.renderKey)
+        self.keys.insert(index, sprite.renderKey)
+        self.sprites.insert(index, sprite)
+        self.index.Add(sprite, sprite.renderBlit[1], sprite.GetSize())
+
+        self.dirtyRects.append(self.index.rects[sprite])
+        self.dirty = True
+
+    def Remove(self, sprite):
+        index = bisect.bisect_left(self.keys, sprite.renderKey)
+        del self.keys[index]
+        del self.sprites[index]
+
+        self.dirtyRects.append(self.index.rects[sprite])
+        self.index.Remove(sprite)
+        self.dirty = True
+
+    def Move(self, sprite):
+        self.dirtyRects.append(self.index.rects[sprite])
+        self.index.Remove(sprite)
+        self.index.Add(sprite, sprite.renderBlit[1], sprite.GetSize())
+
+        self.dirtyRects.append(self.index.rects[sprite])
+        self.dirty = True
+
+    def GetSize(self):
+        return self.surface.get_size()
+
+    def Render(self, camera, bGColour):
+        # returns the composited surface of the sprites the camera can see. The surface is filled with bGColour, or is transparent if it is None
+        view = (camera.position.x, camera.position.y, camera.size.x, camera.size.y)
+
+        if not self.dirty and view == self.drawnView and bGColour == self.drawnBGColour:
+            return self.surface
+
+        size = (int(camera.size.x), int(camera.size.y))
+        if bGColour == None:
+            surface = surfaceCache.Convert(pyg.Surface(size, pyg.SRCALPHA))
+            surface.fill((0, 0, 0, 0))
+        else:
+            surface = surfaceCache.Convert(pyg.Surface(size))
+            surface.fill(bGColour)
+
+        visible = {}
+        self.index.Query(view[0], view[1], view[0] + view[2], view[1] + view[3], visible)
+
+        for sprite in sorted(visible, key=lambda sprite: sprite.renderKey):
+            blit = sprite.renderBlit
+            position = (blit[1].x - view[0], blit[1].y - view[1])
+
+            if len(blit) == 2:
+                surface.blit(blit[0], position)
+            else:
+                surface.blit(blit[0], position, blit[2])
+
+        if view == self.drawnView and bGColour == self.drawnBGColour:
+            self.changedRects = [pyg.Rect(minX - view[0], minY - view[1], maxX - minX, maxY - minY) for minX, minY, maxX, maxY in self.dirtyRects]
+        else:
+            self.changedRects = None
+
+        #a new surface is made each time so that dirty rect rendering sees that the layer changed
+        self.surface = surface
+        self.dirtyRects = []
+        self.dirty = False
+        self.drawnView = view
+        self.drawnBGColour = bGColour
+
+        return surface
+
+
+class RenderList:
+    # the sprites of a scene that are drawn, sorted by layer and then by the order their game objects were added to the scene.
+    # It is updated when a sprite is added, removed, enabled, disabled, or changes layer or image, instead of being rebuilt each frame
+
+    def __init__(self):
+        self.keys = []
+        self.sprites = []
+
+        #(image, position) or (image, position, area) of each sprite, passed to Surface.blits()
+        self.blits = []
+
+        #sprites of game objects without a rigid body are found by their rect in the index. Rigid bodies move every tick so they are tested when drawn
+        self.index = SpriteIndex()
+        self.dynamicSprites = {}
+
+        #layer: StaticLayer. Sprites without a rigid body on these layers are kept by the static layer instead of the lists above
+        self.staticLayers = {}
+
+    def GetStaticLayer(self, sprite):
+        # returns the static layer that holds sprite, or None
+        staticLayer = self.staticLayers.get(sprite.renderKey[0])
+
+        if staticLayer != None and sprite in staticLayer.index.rects:
+            return staticLayer
+        return None
+
+    def SetStaticLayer(self, layer, static = True):
+        # marks a layer as static, so its sprites are composited into one surface that is drawn with one blit, or back to being drawn one by one.
+        # Only the lowest layer is opaque, each layer above it costs a blit of a transparent surface the size of the screen
+        if static == (layer in self.staticLayers):
+            return
+
+        if static:
+            self.staticLayers[layer] = StaticLayer(layer)
+            sprites = [sprite for sprite in self.sprites if sprite.renderKey[0] == layer]
+        else:
+            sprites = list(self.staticLayers[layer].sprites)
+
+        for sprite in sprites:
+            self.Remove(sprite)
+
+        if not static:
+            del self.staticLayers[layer]
+
+        for sprite in sprites:
+            self.Refresh(sprite)
+
+    def Remove(self, sprite):
+        # removes sprite from the list or its static layer
+        staticLayer = self.GetStaticLayer(sprite)
+
+        if staticLayer != None:
+            staticLayer.Remove(sprite)
+        else:
+            index = bisect.bisect_left(self.keys, sprite.renderKey)
+            del self.keys[index]
+            del self.sprites[index]
+            del self.blits[index]
+
+            self.index.Remove(sprite)
+            self.dynamicSprites.pop(sprite, None)
+
+        sprite.renderKey = None
+        sprite.renderBlit = None
+
+    def Refresh(self, sprite):
+        # adds, removes, or moves sprite so that the list matches its current state
+        if sprite.renderKey != None:
+            self.Remove(sprite)
+
+        parent = sprite.parent
+        if parent.inScene and parent.sprite is sprite and sprite.enabled and sprite.image != None:
+            sprite.renderKey = (sprite.layer, parent.sceneOrder)
+
+            #rigid bodies are drawn at their interpolated position
+            if parent.rigidBody == None:
+                position = parent.transform.position
+            else:
+                position = parent.rigidBody.renderPosition
+
+            if sprite.area == None:
+                sprite.renderBlit = (sprite.image, position)
+            else:
+                sprite.renderBlit = (sprite.image, position, sprite.area)
+
+            if parent.rigidBody == None and sprite.layer in self.staticLayers:
+                self.staticLayers[sprite.layer].Add(sprite)
+                return
+
+            index = bisect.bisect_left(self.keys, sprite.renderKey)
+            self.keys.insert(index, sprite.renderKey)
+            self.sprites.insert(index, sprite)
+            self.blits.insert(index, sprite.renderBlit)
+
+            if parent.rigidBody == None:
+                self.index.Add(sprite, position, sprite.GetSize())
+            else:
+                self.dynamicSprites[sprite] = None
+
+    def Move(self, sprite):
+        # updates the rect of a sprite in the index after its game object was moved
+        if sprite.renderKey == None or sprite in self.dynamicSprites:
+            return
+
+        staticLayer = self.GetStaticLayer(sprite)
+        if staticLayer != None:
+            staticLayer.Move(sprite)
+        else:
+            self.index.Remove(sprite)
+            self.index.Add(sprite, sprite.parent.transform.position, sprite.GetSize())
+
+    def GetVisible(self, minX, minY, maxX, maxY):
+        # returns the sprites that overlap the region in the order they are drawn. Returns sprites[] itself if every sprite is visible
+        visible = {}
+        self.index.Query(minX, minY, maxX, maxY, visible)
+
+        for sprite in self.dynamicSprites:
+            position = sprite.renderBlit[1]
+            size = sprite.GetSize()
+
+            if position.x < maxX and position.x + size[0] > minX and position.y < maxY and position.y + size[1] > minY:
+                visible[sprite] = None
+
+        if len(visible) == len(self.sprites):
+            return self.sprites
+
+        #when most sprites are visible it is quicker to filter the sorted list than to sort the visible sprites
+        if len(visible) * 4 > len(self.sprites):
+            return [sprite for sprite in self.sprites if sprite in visible]
+
+        return sorted(visible, key=lambda sprite: sprite.renderKey)
+
+
+class GameObjectList:
+    # game objects in no particular order that can be added and removed in constant time. The scene keeps one for each
+    # kind of component, so that each phase of a tick only iterates the game objects it acts on
+
+    def __init__(self):
+        self.gameObjects = []
+        self.indices = {}
+
+    def __iter__(self):
+        return iter(self.gameObjects)
+
+    def __len__(self):
+        return len(self.gameObjects)
+
+    def __contains__(self, gameObject):
+        return gameObject in self.indices
+
+    def Add(self, gameObject):
+        if gameObject not in self.indices:
+            self.indices[gameObject] = len(self.gameObjects)
+            self.gameObjects.append(gameObject)
+
+    def Remove(self, gameObject):
+        #the last game object is moved into the place of the removed one
+        index = self.indices.pop(gameObject, None)
+        if index == None:
+            return
+
+        last = self.gameObjects.pop()
+        if last is not gameObject:
+            self.gameObjects[index] = last
+            self.indices[last] = index
+
+    def Set(self, gameObject, included):
+        if included:
+            self.Add(gameObject)
+        else:
+            self.Remove(gameObject)
+
+
+class WaitFrames:
+    # yielded by a coroutine script to resume it after frames ticks
+
+    def __init__(self, frames):
+        self.frames = frames
+
+
+class WaitSeconds:
+    # yielded by a coroutine script to resume it after seconds of game time. Seconds are counted in ticks, so waits are the same in replays
+    # and headless matches
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class WaitEvent:
+    # yielded by a coroutine script to resume it on the next tick after any of events happens. Each event is a pygame event type, the name
+    # of an input action, or a list of callbacks such as Button.onReleasedIn. The yield returns the argument the callback was called with,
+    # or a tuple of them if there were several
+
+    def __init__(self, *events):
+        self.events = events
+
+
+class ScriptScheduler:
+    # updates the scripts of a scene, and the game objects that override Update(), in order of their updatePriority. Entries with an
+    # updateInterval above 1 and coroutines that are waiting are kept in timers or subscribed to their events instead of the list of
+    # entries updated every tick, so they cost nothing until they are due
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.tick = 0
+        self.sequence = 0
+
+        #entry: (updatePriority, sequence) of each scheduled entry. Entries with the same priority are updated in the order they were added
+        self.entryKeys = {}
+
+        #entries updated every tick, sorted by their key
+        self.keys = []
+        self.entries = []
+
+        #tick: entries due on that tick, entry: the tick it is due
+        self.timers = {}
+        self.dueTicks = {}
+
+        #entry: value sent to the coroutine. Entries whose event happened, and entries just added, are updated on the next tick
+        self.resumed = {}
 
-       # def __init__(self, scene, topLeft, size, bGColour, text, textSize, textColour, font, textOffset):
-        self.blits = [[] for _ in range(10)]
-        self.scenes = {}
-        pyg.event.set_allowed(allowedEvents)
+        #entry: (event, callback) of each event a coroutine is waiting for
+        self.waits = {}
 
-        self.currentScene = None
+        #script: generator of each coroutine script that has started
+        self.coroutines = {}
 
-    def GetUpdateTime(self):
-        # gets the time since the last frame update
-        self.currentFrameTime = time.time()
-        self.updateTime = self.currentFrameTime - self.previousFrameTime
+        #game object: entries, so that scripts that were removed can be found
+        self.objectEntries = {}
 
-        self.previousFrameTime = time.time()
+    #class: whether its Update() is a generator function
+    coroutineClasses = {}
 
+    @staticmethod
+    def IsCoroutine(entry):
+        # scripts whose Update() is a generator function are coroutines. Each yield suspends them until what they yielded is due
+        entryType = type(entry)
+        coroutine = ScriptScheduler.coroutineClasses.get(entryType)
 
-    def ChangeScene(self, newScene):
-        del self.currentScene
-        self.currentScene = newScene
+        if coroutine == None:
+            coroutine = inspect.isgeneratorfunction(entryType.Update)
+            ScriptScheduler.coroutineClasses[entryType] = coroutine
 
+        return coroutine
 
-    def UpdateScripts(self):
-        #runs each scripts attached to each game object in the current scene
+    def Refresh(self, gameObject, entries):
+        # schedules entries, the scripts or game object that update for gameObject, and removes the ones it no longer has
+        previous = self.objectEntries.get(gameObject, ())
 
-        gameObjects = self.currentScene.gameObjects
+        for entry in previous:
+            if entry not in entries:
+                self.Remove(entry)
 
-        for gameObject in gameObjects:
-            gameObject.Update()
+        for entry in entries:
+            if entry not in previous:
+                self.Add(entry)
 
-    def CastRigidBodies(self):
-        #casts the new position of each rigid body
+        if entries != []:
+            self.objectEntries[gameObject] = entries
+        else:
+            self.objectEntries.pop(gameObject, None)
 
-        for gameObject in self.currentScene.gameObjects:
-            if gameObject.rigidBody != None:
-                gameObject.rigidBody.Cast()
+    def Add(self, entry):
+        key = (entry.updatePriority, self.sequence)
+        self.sequence += 1
+        self.entryKeys[entry] = key
 
+        if entry.updateInterval == 1 and not self.IsCoroutine(entry):
+            index = bisect.bisect_left(self.keys, key)
+            self.keys.insert(index, key)
+            self.entries.insert(index, entry)
+        else:
+            self.resumed[entry] = None
 
-    def UpdateCollisions(self):
-        #checks if pairs of game objects have colliders and sends them to CheckForCollisions()
-        gameObjects = self.currentScene.gameObjects
+    def Remove(self, entry):
+        # unschedules entry. A coroutine that is removed keeps its place in its generator and continues from it on the tick after it is added again
+        key = self.entryKeys.pop(entry)
 
-        for primObj in gameObjects:
-            if primObj.collider != None:
-                if primObj.collider.enabled == True:
-                    primObj.collider.collisions = []
+        index = bisect.bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+            del self.entries[index]
 
-                    for secObj in gameObjects:
-                        if secObj != primObj and secObj.collider != None:
+        dueTick = self.dueTicks.pop(entry, None)
+        if dueTick != None:
+            self.timers[dueTick].remove(entry)
 
-                            if secObj.collider.enabled == True:
-                                self.CheckForCollision(primObj, secObj)
+        self.resumed.pop(entry, None)
+        self.CancelWait(entry)
 
-    @staticmethod
-    def CheckForCollision(primObj, secObj):
-        #checks if the casted rigid body(s) will collide
+    def Run(self, timings = None):
+        # updates the entries due this tick. timings is a dict of the time spent in each class, filled in when the scripts are profiled
+        tick = self.tick
+        self.tick += 1
 
-        if primObj.rigidBody == None:
-            primPosition = primObj.transform.position
-        else:
-            primPosition = primObj.rigidBody.castPosition
+        due = self.timers.pop(tick, [])
+        resumed = self.resumed
+        self.resumed = {}
 
-        if secObj.rigidBody == None:
-            secPosition = secObj.transform.position
+        #scripts can add and remove entries while they update, so a copy is iterated
+        if due == [] and resumed == {}:
+            entries = list(self.entries)
+        else:
+            for entry in due:
+                del self.dueTicks[entry]
+
+            entryKeys = self.entryKeys
+            waiting = sorted(due + list(resumed), key=entryKeys.__getitem__)
+            entries = list(heapq.merge(self.entries, waiting, key=entryKeys.__getitem__))
+
+        perfCounter = time.perf_counter
+        for entry in entries:
+            #entries removed by an earlier update this tick are skipped
+            if entry not in self.entryKeys:
+                continue
+
+            if timings != None:
+                start = perfCounter()
+
+            if self.IsCoroutine(entry):
+                self.Resume(entry, resumed.get(entry), tick)
+            else:
+                entry.Update()
+                if entry.updateInterval != 1 and entry in self.entryKeys:
+                    self.Schedule(entry, tick + entry.updateInterval)
+
+            if timings != None:
+                name = type(entry).__name__
+                timings[name] = timings.get(name, 0) + perfCounter() - start
+
+    def Schedule(self, entry, dueTick):
+        self.dueTicks[entry] = dueTick
+        self.timers.setdefault(dueTick, []).append(entry)
+
+    def Resume(self, entry, value, tick):
+        # runs a coroutine script until its next yield and schedules it for what it yielded. A coroutine that returns is not updated again
+        # until it is removed and added, which starts it over
+        generator = self.coroutines.get(entry)
+        if generator == None:
+            generator = entry.Update()
+            self.coroutines[entry] = generator
+
+        try:
+            wait = generator.send(value)
+        except StopIteration:
+            del self.coroutines[entry]
+            return
+
+        if entry not in self.entryKeys:
+            return
+
+        if wait == None:
+            self.Schedule(entry, tick + entry.updateInterval)
+        elif type(wait) is WaitFrames:
+            self.Schedule(entry, tick + max(1, wait.frames))
+        elif type(wait) is WaitSeconds:
+            self.Schedule(entry, tick + max(1, math.ceil(wait.seconds * self.scene.gameManager.tickRate)))
+        elif type(wait) is WaitEvent:
+            self.Wait(entry, wait.events)
         else:
-            secPosition = secObj.rigidBody.castPosition
+            raise TypeError("coroutine scripts can only yield None, WaitFrames, WaitSeconds, or WaitEvent, not " + repr(wait))
 
-        primSize = primObj.collider.size
-        secSize = secObj.collider.size
+    def Wait(self, entry, events):
+        # subscribes to each event, so that the first one to happen resumes the coroutine
+        def Callback(*args):
+            self.CancelWait(entry)
+            self.resumed[entry] = args[0] if len(args) == 1 else args
 
-        if primPosition.x < secPosition.x + secSize.x and primPosition.x + primSize.x > secPosition.x:
-            if primPosition.y < secPosition.y + secSize.y and primPosition.y + primSize.y > secPosition.y:
-                primObj.collider.collisions.append(secObj.collider)
+        input = self.scene.gameManager.input
+        subscriptions = []
 
+        for event in events:
+            if type(event) is int:
+                input.SubscribeEvent(event, Callback)
+            elif type(event) is str:
+                input.Subscribe(event, Callback)
+            else:
+                event.append(Callback)
+            subscriptions.append((event, Callback))
 
-    def MoveRigidBodies(self):
-        #moves rigid bodies to their casted positions if they have no collisions
+        self.waits[entry] = subscriptions
 
-        for gameObject in self.currentScene.gameObjects:
-            if gameObject.rigidBody != None:
-                if gameObject.collider != None:
-                    if gameObject.collider.collisions == []:
-                        gameObject.transform.position = gameObject.rigidBody.castPosition
+    def CancelWait(self, entry):
+        input = self.scene.gameManager.input
 
-                else:
-                    gameObject.transform.position = gameObject.rigidBody.castPosition
-                    gameObject.rigidBody.velocity = Vector2.Zero()
+        for event, callback in self.waits.pop(entry, ()):
+            if type(event) is int:
+                input.UnsubscribeEvent(event, callback)
+            elif type(event) is str:
+                input.Unsubscribe(event, callback)
+            else:
+                event.remove(callback)
 
-    def UpdateWindow(self):
-        #If game object has a sprite add this game object to the corresponsing layer of blits[]. Update graphics on screen
-        gameObjects = self.currentScene.gameObjects
 
-        for gameObject in gameObjects:
-            if type(gameObject.sprite) is Sprite:
-                if gameObject.sprite.enabled:
-                    self.blits[gameObject.sprite.layer].append(Blit(gameObject.sprite.image, gameObject.transform.position))
+class SceneRegistration:
+    # how a game manager builds a named scene, and the built scene if it is pooled or preloaded
 
-        self.win.fill(self.winBGColour)
-        for layer in self.blits:
-            for blit in layer:
-                self.win.blit(blit.image, blit.position)
+    def __init__(self, factory, pooled, preload):
+        self.factory = factory
+        self.pooled = pooled
+        self.preload = preload
+        self.instance = None
+
+        #future of the scene while it is being preloaded on the loading thread
+        self.loading = None
 
-        pyg.display.update()
-        self.blits = [[] for _ in range(10)]
 
-        
 class Scene:
     #base class for scenes 
 
@@ -183,11 +2597,145 @@ class Scene:
         self.gameObjects = []
         self.gameManager = gameManager
 
+        #sprites to draw, sorted by layer. Only enabled sprites with an image are in it
+        self.renderList = RenderList()
+        self.appendedCount = 0
+
+        #scripts and game objects with their own Update() are updated by the scheduler. Game objects with a rigid body and with an enabled
+        #collider are kept in lists. See RefreshComponents()
+        self.scheduler = ScriptScheduler(self)
+        self.rigidBodyObjects = GameObjectList()
+        self.colliderObjects = GameObjectList()
+
+        #colliders without a rigid body never move on their own, so they are indexed once and queried by the rigid bodies
+        self.staticColliderIndex = StaticColliderIndex()
+
+        #optional backend that runs the physics of the scene, see UseArrayPhysics()
+        self.physics = None
+
+        #buttons and other elements that are clicked with the mouse
+        self.uiIndex = UIIndex()
+
+        #random numbers used by the scene, see GameManager.CreateRandom()
+        self.random = gameManager.CreateRandom(type(self).__name__)
+
+        #name and args the scene was last changed to with, if it is registered. See GameManager.GetScene()
+        self.registeredName = None
+        self.registeredArgs = ()
+
+        #game objects that collided with something in the last tick, and game object: set of colliders it is touching. See GameManager.UpdateContacts()
+        self.collidedObjects = []
+        self.touchingColliders = {}
+
+    def Reset(self, *args):
+        # called when a pooled scene is used again. Override to return the scene to its starting state
+        pass
+
+    def UseArrayPhysics(self):
+        # runs the physics of this scene as batched numpy array operations
+        self.physics = ArrayPhysics(self)
+
+    def InvalidatePhysics(self, gameObject = None):
+        # called when game objects are added or removed, or their colliders or rigid bodies change.
+        # When the game object is given, only the physics it takes part in are invalidated
+        collider = getattr(gameObject, "_collider", None)
+        rigidBody = getattr(gameObject, "_rigidBody", None)
+
+        if gameObject == None or (collider != None and rigidBody == None):
+            self.staticColliderIndex.Invalidate()
+
+        if self.physics != None and (gameObject == None or collider != None or rigidBody != None):
+            self.physics.Invalidate()
+
+    def RefreshComponents(self, gameObject):
+        # adds or removes the game object from the scene's component lists so that they match its current components.
+        # Called when the game object is added or removed, and when its scripts, rigid body, or collider are attached, detached, enabled, or disabled
+        inScene = getattr(gameObject, "inScene", False)
+        scripts = getattr(gameObject, "_scripts", [])
+        rigidBody = getattr(gameObject, "_rigidBody", None)
+        collider = getattr(gameObject, "_collider", None)
+
+        #game objects with their own Update() are updated as a whole. Otherwise each script is scheduled, except scripts that only respond to callbacks
+        if not inScene:
+            entries = []
+        elif type(gameObject).Update is not GameObject.Update:
+            entries = [gameObject]
+        else:
+            entries = [script for script in scripts if script.enabled and type(script).Update is not Script.Update]
+
+        self.scheduler.Refresh(gameObject, entries)
+        self.rigidBodyObjects.Set(gameObject, inScene and rigidBody != None)
+        self.colliderObjects.Set(gameObject, inScene and collider != None and collider.enabled)
+
     def AppendGameObject(self, gameObject):
+        #each game object stores its index in gameObjects[] so that it can be removed in constant time
+        gameObject.sceneIndex = len(self.gameObjects)
         self.gameObjects.append(gameObject)
+        self.InvalidatePhysics(gameObject)
+
+        #game objects on the same layer are drawn in the order they were added
+        gameObject.inScene = True
+        gameObject.sceneOrder = self.appendedCount
+        self.appendedCount += 1
+        self.RefreshComponents(gameObject)
+
+        #game objects that are still being constructed add their sprite when it is assigned
+        if hasattr(gameObject, "_sprite"):
+            self.renderList.Refresh(gameObject.sprite)
     
     def RemoveGameObject(self, gameObject):
-        self.gameObjects.remove(gameObject)
+        # removes the game object by moving the last game object into its place, so the order of gameObjects[] changes
+        if not getattr(gameObject, "inScene", False) or gameObject.scene is not self:
+            raise ValueError("game object is not in this scene")
+
+        last = self.gameObjects.pop()
+        if last is not gameObject:
+            self.gameObjects[gameObject.sceneIndex] = last
+            last.sceneIndex = gameObject.sceneIndex
+
+        gameObject.sceneIndex = None
+        self.InvalidatePhysics(gameObject)
+
+        gameObject.inScene = False
+        self.RefreshComponents(gameObject)
+        self.renderList.Refresh(gameObject.sprite)
+
+
+class GameObjectPool:
+    # preallocated game objects that are spawned into and despawned from a scene instead of being created and thrown away.
+    # Game objects keep their transform, sprite, rigid body, collider, and scripts while they wait in the pool
+
+    def __init__(self, scene, factory, size = 0):
+        # factory(scene) returns a new game object for the pool. size game objects are made straight away
+        self.scene = scene
+        self.factory = factory
+        self.free = []
+
+        for _ in range(size):
+            self.Despawn(factory(scene))
+
+    def Spawn(self, position = None):
+        # adds a game object from the pool to the scene, making a new one if the pool is empty
+        if self.free == []:
+            gameObject = self.factory(self.scene)
+        else:
+            gameObject = self.free.pop()
+            self.scene.AppendGameObject(gameObject)
+
+        #a recycled rigid body is not drawn moving from where it was despawned
+        if gameObject.rigidBody != None:
+            gameObject.rigidBody.Teleport(position if position != None else gameObject.transform.position)
+        elif position != None:
+            gameObject.transform.position = position
+
+        gameObject.OnSpawn()
+        return gameObject
+
+    def Despawn(self, gameObject):
+        # removes the game object from the scene and returns it to the pool
+        gameObject.OnDespawn()
+        self.scene.RemoveGameObject(gameObject)
+        self.free.append(gameObject)
 
 
 class Component():
@@ -198,18 +2746,96 @@ class Component():
 
 
 class Script(Component):
-    # base class for scripts attached to game objects
+    # base class for scripts attached to game objects. Scripts are updated every updateInterval ticks, in order of updatePriority from lowest
+    # to highest. An Update() that yields is a coroutine, which is suspended by yielding WaitFrames, WaitSeconds, or WaitEvent, or by yielding
+    # None until its next update. Set both before the script is added, or disable and enable it to apply a change
+
+    updatePriority = 0
+    updateInterval = 1
 
     def __init__(self, parent):
         super().__init__(parent)
         self.enabled = True
 
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        #game objects without an enabled script are not updated
+        self._enabled = enabled
+        self.parent.scene.RefreshComponents(self.parent)
+
     def Update(self):
         pass
 
+    def OnCollisionEnter(self, collider):
+        # called when the collider of the parent starts touching collider
+        pass
+
+    def OnCollisionStay(self, collider):
+        # called each tick the collider of the parent keeps touching collider
+        pass
+
+    def OnCollisionExit(self, collider):
+        # called when the collider of the parent stops touching collider
+        pass
+
+
+class ScriptList(list):
+    # the scripts of a game object. Adding or removing scripts updates the scene's list of game objects with scripts
+
+    def __init__(self, parent, scripts = ()):
+        super().__init__(scripts)
+        self.parent = parent
+
+    def Refresh(self):
+        self.parent.scene.RefreshComponents(self.parent)
+
+    def append(self, script):
+        super().append(script)
+        self.Refresh()
+
+    def extend(self, scripts):
+        super().extend(scripts)
+        self.Refresh()
+
+    def insert(self, index, script):
+        super().insert(index, script)
+        self.Refresh()
+
+    def remove(self, script):
+        super().remove(script)
+        self.Refresh()
+
+    def pop(self, index = -1):
+        script = super().pop(index)
+        self.Refresh()
+        return script
+
+    def clear(self):
+        super().clear()
+        self.Refresh()
+
+    def __setitem__(self, index, script):
+        super().__setitem__(index, script)
+        self.Refresh()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.Refresh()
+
+    def __iadd__(self, scripts):
+        self.extend(scripts)
+        return self
+
 
 class GameObject:
-    # base class for game objects within a scene
+    # base class for game objects within a scene. Subclasses that override Update() are scheduled like a Script
+
+    updatePriority = 0
+    updateInterval = 1
 
     def __init__(self, scene):
         #get reference to the game manager and add self to its gameObjects[]
@@ -217,6 +2843,9 @@ class GameObject:
         self.scene.AppendGameObject(self)
         self.gameManager = self.scene.gameManager
 
+        #set by the scene's UIIndex, which is invalidated when the game object moves
+        self.inUIIndex = False
+
         self.scripts = []
 
         self.transform = Transform(self)
@@ -224,6 +2853,62 @@ class GameObject:
         self.collider = None
         self.rigidBody = None
 
+    @property
+    def sprite(self):
+        return self._sprite
+
+    @sprite.setter
+    def sprite(self, sprite):
+        #replacing the sprite swaps it in the scene's render list
+        previousSprite = getattr(self, "_sprite", None)
+        self._sprite = sprite
+
+        if previousSprite != None:
+            self.scene.renderList.Refresh(previousSprite)
+        self.scene.renderList.Refresh(sprite)
+
+    @property
+    def scripts(self):
+        return self._scripts
+
+    @scripts.setter
+    def scripts(self, scripts):
+        self._scripts = ScriptList(self, scripts)
+        self.scene.RefreshComponents(self)
+
+    @property
+    def collider(self):
+        return self._collider
+
+    @collider.setter
+    def collider(self, collider):
+        #attaching or removing a collider can change the static colliders in the scene
+        self._collider = collider
+        self.scene.InvalidatePhysics()
+        self.scene.RefreshComponents(self)
+
+    @property
+    def rigidBody(self):
+        return self._rigidBody
+
+    @rigidBody.setter
+    def rigidBody(self, rigidBody):
+        #a collider is only static while its game object has no rigid body
+        self._rigidBody = rigidBody
+        self.scene.InvalidatePhysics()
+        self.scene.RefreshComponents(self)
+
+        #rigid bodies are drawn at their interpolated position
+        if hasattr(self, "_sprite"):
+            self.scene.renderList.Refresh(self.sprite)
+
+    def OnSpawn(self):
+        # called when the game object is spawned from a GameObjectPool. Override to reset its state
+        pass
+
+    def OnDespawn(self):
+        # called when the game object is returned to a GameObjectPool
+        pass
 
     def Update(self):
         # calls all scripts attached to this game object
@@ -232,6 +2917,21 @@ class GameObject:
             if script.enabled:
                 script.Update()
 
+    def OnCollisionEnter(self, collider):
+        for script in self.scripts:
+            if script.enabled:
+                script.OnCollisionEnter(collider)
+
+    def OnCollisionStay(self, collider):
+        for script in self.scripts:
+            if script.enabled:
+                script.OnCollisionStay(collider)
+
+    def OnCollisionExit(self, collider):
+        for script in self.scripts:
+            if script.enabled:
+                script.OnCollisionExit(collider)
+
 
     def Enable(self):
         # enables all scripts and components on this game object
@@ -262,55 +2962,417 @@ class GameObject:
             self.rigidBody.enabled = False
 
 
-class Blit:
-    # stores images that are to be printed to the screen
+class Transform (Component):
+    def __init__(self, parent, position= Vector2.zero):
+        super().__init__(parent)
+
+        #the transform owns its position vector. Assigning a position copies it into this vector, and any change to it calls Moved()
+        self._position = TransformVector2(self, position.x, position.y)
+
+    @property
+    def position(self):
+        return self._position
 
-    def __init__(self, image, position):
-        self.image = image
-        self.position = position.Tuple()
+    @position.setter
+    def position(self, position):
+        self._position.CopyFrom(position)
 
+    def Moved(self):
+        # called by the position vector whenever it changes. Rigid bodies are drawn at their render position and are not indexed
+        parent = self.parent
 
+        if parent.inUIIndex:
+            parent.scene.uiIndex.Invalidate()
 
+        if parent._rigidBody != None:
+            return
 
+        #static colliders are indexed by position, so moving one invalidates the index
+        if parent._collider != None:
+            parent.scene.staticColliderIndex.Invalidate()
 
-class Transform (Component):
-    def __init__(self, parent, position= Vector2.Zero()):
-        super().__init__(parent)
-        self.position = position
+        #sprites of game objects without a rigid body are indexed by their rect
+        sprite = getattr(parent, "_sprite", None)
+        if sprite != None:
+            parent.scene.renderList.Move(sprite)
 
 
 class Sprite(Component):
-    def __init__(self, parent, image, enabled = True):
+    def __init__(self, parent, image, enabled = True, area = None):
         super().__init__(parent)
 
-        self.image = image
+        self._image = image
+        #rect of image that is drawn, used when the image is a shared texture atlas. None draws the whole image
+        self._area = area
         #higher layers are printed to the screen after lower layers
-        self.layer = 0
-        self.enabled = enabled
+        self._layer = 0
+        self._enabled = enabled
+
+        #position of this sprite in the scene's render list and the blit that draws it, None when it is not drawn
+        self.renderKey = None
+        self.renderBlit = None
+
+    #changing the image, layer, or enabled updates the scene's render list
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, image):
+        self._image = image
+        self.parent.scene.renderList.Refresh(self)
+
+    @property
+    def area(self):
+        return self._area
+
+    @area.setter
+    def area(self, area):
+        self._area = area
+        self.parent.scene.renderList.Refresh(self)
+
+    def GetSize(self):
+        # returns the (width, height) drawn on the screen
+        if self._area == None:
+            return self._image.get_size()
+        return self._area.size
+
+    @property
+    def layer(self):
+        return self._layer
+
+    @layer.setter
+    def layer(self, layer):
+        self._layer = layer
+        self.parent.scene.renderList.Refresh(self)
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        self.parent.scene.renderList.Refresh(self)
 
 
 class RigidBody(Component):
     def __init__(self, parent):
         super().__init__(parent)
 
-        #velocity in pixels/frame
-        self.velocity = Vector2.Zero()
-        self.castPosition = Vector2.Zero()
+        #velocity in pixels/tick
+        self._velocity = Vector2(0, 0)
+        self._castPosition = Vector2(0, 0)
+
+        #continuous rigid bodies are tested along the whole path they move each tick so that fast ones cannot pass through colliders,
+        #and are moved to where they first touch a collider instead of not moving. contactTime is the fraction of the last tick at which
+        #they touched, and contactNormal points away from the collider they touched. Not supported by ArrayPhysics
+        self.continuous = False
+        self.contactTime = 1
+        self.contactNormal = Vector2(0, 0)
+
+        #position before the last tick, and the position between it and the current position that is drawn
+        position = parent.transform.position
+        self.previousPosition = Vector2(position.x, position.y)
+        self.renderPosition = Vector2(position.x, position.y)
+
+    #the rigid body owns its vectors, assigning velocity or castPosition copies into them.
+    #This keeps them as views into the scene's arrays while it uses ArrayPhysics
+    @property
+    def velocity(self):
+        return self._velocity
+
+    @velocity.setter
+    def velocity(self, velocity):
+        self._velocity.CopyFrom(velocity)
+
+    @property
+    def castPosition(self):
+        return self._castPosition
+
+    @castPosition.setter
+    def castPosition(self, castPosition):
+        self._castPosition.CopyFrom(castPosition)
 
     def Cast(self):
-        self.castPosition = self.parent.transform.position + self.velocity
+        position = self.parent.transform.position
+        self.previousPosition.CopyFrom(position)
+        self._castPosition.Set(position.x + self._velocity.x, position.y + self._velocity.y)
+
+    def Teleport(self, position):
+        # moves the game object to position without it being drawn moving there from where it was, for spawns and resets
+        self.parent.transform.position = position
+
+        position = self.parent.transform.position
+        self.previousPosition.CopyFrom(position)
+        self.renderPosition.CopyFrom(position)
+        self._castPosition.CopyFrom(position)
 
 
 class BoxCollider(Component):
-    def __init__(self, parent, size):
+    # layer is a bit flag and mask is the layers the collider can collide with. A pair of colliders is only tested if each one's
+    # layer is in the other's mask. By default colliders are on layer 1 and collide with every layer
+
+    allLayers = -1
+
+    def __init__(self, parent, size, layer = 1, mask = allLayers):
         super().__init__(parent)
 
-        self.enabled = True
+        self._enabled = True
+        self._layer = layer
+        self._mask = mask
         self.size = size
 
         #store each game object that collided with self
         self.collisions = []
 
+        #(contact time, other collider) of each swept contact of a continuous rigid body this tick, see GameManager.ResolveSweptContacts()
+        self.sweptContacts = []
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        self.parent.scene.RefreshComponents(self.parent)
+
+        physics = self.parent.scene.physics
+        if physics != None:
+            physics.enabledDirty = True
+
+    @property
+    def layer(self):
+        return self._layer
+
+    @layer.setter
+    def layer(self, layer):
+        self._layer = layer
+
+        physics = self.parent.scene.physics
+        if physics != None:
+            physics.enabledDirty = True
+
+    @property
+    def mask(self):
+        return self._mask
+
+    @mask.setter
+    def mask(self, mask):
+        self._mask = mask
+
+        physics = self.parent.scene.physics
+        if physics != None:
+            physics.enabledDirty = True
+
+
+class TextureAtlas:
+    # surface that small images are packed into row by row, so that sprites can share it and draw a sub-rect
+
+    def __init__(self, size, alpha):
+        self.size = size
+        self.surface = surfaceCache.Convert(pyg.Surface((size, size), pyg.SRCALPHA if alpha else 0))
+
+        self.rowX = 0
+        self.rowY = 0
+        self.rowHeight = 0
+
+    def Add(self, image):
+        # copies image into the atlas and returns the rect it was placed at, or None if the atlas is full
+        width, height = image.get_size()
+
+        if self.rowX + width > self.size:
+            self.rowX = 0
+            self.rowY += self.rowHeight
+            self.rowHeight = 0
+
+        if self.rowX + width > self.size or self.rowY + height > self.size:
+            return None
+
+        area = pyg.Rect(self.rowX, self.rowY, width, height)
+        self.surface.blit(image, area)
+
+        self.rowX += width
+        self.rowHeight = max(self.rowHeight, height)
+
+        return area
+
+
+class SurfaceCache:
+    # asset pipeline for the surfaces used by sprites. Surfaces are converted to the display's pixel format so blits do not convert each frame,
+    # and boxes with the same size and colour share one surface. In atlas mode small images are packed into shared TextureAtlas surfaces
+
+    def __init__(self):
+        self.boxes = {}
+
+        #scenes can be built on the loading thread while the main thread draws, see GameManager.RunInExecutor()
+        self.lock = threading.RLock()
+
+        #atlas mode only affects surfaces created after it is turned on
+        self.useAtlas = False
+        self.atlasSize = 1024
+        self.maxAtlasImageSize = 128
+        self.atlases = {True: [], False: []}
+
+    def Convert(self, surface):
+        # returns surface in the display's pixel format. Surfaces are left as they are until a display mode has been set
+        if pyg.display.get_surface() == None:
+            return surface
+
+        if surface.get_flags() & pyg.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def GetBox(self, size, colour):
+        # returns (image, area) for a box filled with colour. The image is shared, so it must not be drawn on
+        key = (int(size.x), int(size.y), tuple(colour))
+
+        with self.lock:
+            box = self.boxes.get(key)
+
+            if box == None:
+                image = pyg.Surface(key[:2])
+                image.fill(colour)
+                box = self.AddImage(image)
+                self.boxes[key] = box
+
+        return box
+
+    def AddImage(self, image):
+        # converts image and, in atlas mode, packs it into an atlas if it is small enough. Returns (image, area) for a Sprite
+        image = self.Convert(image)
+        width, height = image.get_size()
+
+        if not self.useAtlas or width > self.maxAtlasImageSize or height > self.maxAtlasImageSize:
+            return (image, None)
+
+        with self.lock:
+            #images with per pixel alpha go into separate atlases so opaque images stay fast to blit
+            atlases = self.atlases[bool(image.get_flags() & pyg.SRCALPHA)]
+
+            for atlas in atlases:
+                area = atlas.Add(image)
+                if area != None:
+                    return (atlas.surface, area)
+
+            atlas = TextureAtlas(self.atlasSize, bool(image.get_flags() & pyg.SRCALPHA))
+            atlases.append(atlas)
+
+            return (atlas.surface, atlas.Add(image))
+
+    def Clear(self):
+        self.boxes = {}
+        self.atlases = {True: [], False: []}
+
+
+#surface cache shared by every Box
+surfaceCache = SurfaceCache()
+
+
+class TextCache:
+    # caches fonts by (font, size), rendered text surfaces by (text, font, size, colour, background), and the text boxes made from them.
+    # Once maxSurfaces text surfaces or boxes are stored the least recently used one is dropped
+
+    def __init__(self, maxSurfaces = 256):
+        self.maxSurfaces = maxSurfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.boxes = OrderedDict()
+
+        #text can be rendered on the loading thread while the main thread draws, see GameManager.RunInExecutor()
+        self.lock = threading.RLock()
+
+        #counters for the text surface cache, and for the box cache
+        self.hits = 0
+        self.misses = 0
+        self.boxHits = 0
+        self.boxMisses = 0
+
+    def GetFont(self, font, size):
+        # returns the font object, only looking up the font the first time it is used
+        key = (font, size)
+
+        with self.lock:
+            fontObj = self.fonts.get(key)
+
+            if fontObj == None:
+                fontObj = pyg.font.SysFont(font, size)
+                self.fonts[key] = fontObj
+
+        return fontObj
+
+    def Render(self, text, font, size, colour, background = None):
+        # returns the rendered text surface. The surface is shared so it must not be drawn on
+        key = (text, font, size, colour, background)
+
+        with self.lock:
+            surface = self.surfaces.get(key)
+
+            if surface != None:
+                self.hits += 1
+                self.surfaces.move_to_end(key)
+                return surface
+
+            self.misses += 1
+            surface = surfaceCache.Convert(self.GetFont(font, size).render(text, True, colour, background))
+            self.surfaces[key] = surface
+
+            if len(self.surfaces) > self.maxSurfaces:
+                self.surfaces.popitem(last=False)
+
+        return surface
+
+    def RenderUncached(self, text, font, size, colour, background = None):
+        # returns a new text surface without storing it, for text that changes too often to cache. Fonts are only used under the lock
+        # because text can be rendered on the loading thread at the same time
+        with self.lock:
+            return self.GetFont(font, size).render(text, True, colour, background)
+
+    def RenderBox(self, size, bGColour, text, textSize, textColour, font, textOffset):
+        # returns a surface of size filled with bGColour with the text drawn at textOffset. Boxes are cached like text surfaces, so
+        # a Counter going back to a count it has shown does not allocate a new surface. The surface is shared so it must not be drawn on
+        key = (size.Tuple(), tuple(bGColour), text, textSize, tuple(textColour), font, textOffset.Tuple())
+
+        with self.lock:
+            image = self.boxes.get(key)
+
+            if image != None:
+                self.boxHits += 1
+                self.boxes.move_to_end(key)
+                return image
+
+            self.boxMisses += 1
+            image = pyg.Surface(key[0])
+            image.fill(bGColour)
+            image.blit(self.Render(text, font, textSize, textColour, bGColour), key[6])
+            image = surfaceCache.Convert(image)
+            self.boxes[key] = image
+
+            if len(self.boxes) > self.maxSurfaces:
+                self.boxes.popitem(last=False)
+
+        return image
+
+    def Clear(self):
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.boxes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.boxHits = 0
+        self.boxMisses = 0
+
+
+#text cache shared by every TextBox, Button, and Counter
+textCache = TextCache()
+
+
+def RenderTextBox(size, bGColour, text, textSize, textColour, font, textOffset):
+    # returns a surface filled with bGColour with the text drawn at textOffset. The surface is shared so it must not be drawn on
+
+    return textCache.RenderBox(size, bGColour, text, textSize, textColour, font, textOffset)
+
 
 class Box(GameObject):
     def __init__(self, scene, position, size, colour):
@@ -319,9 +3381,9 @@ class Box(GameObject):
         self.transform.position = position
         self.size = size
 
-        image = pyg.Surface((size.x, size.y))
-        image.fill(colour)
-        self.sprite = Sprite(self, image, enabled= True)
+        #boxes with the same size and colour share an image
+        image, area = surfaceCache.GetBox(size, colour)
+        self.sprite = Sprite(self, image, enabled= True, area= area)
 
 
 class TextBox(Box):
@@ -336,36 +3398,32 @@ class TextBox(Box):
         self.font = font
         self.textOffset = textOffset
 
-        image = pyg.Surface(self.size.Tuple())
-        image.fill(self.bGColour1)
-        fontObj = pyg.font.SysFont(self.font, self.textSize)
-        textObj = fontObj.render(self.text, True, self.textColour)
-        image.blit(textObj, self.textOffset.Tuple())
-
-        self.sprite = Sprite(self, image)
+        self.sprite = Sprite(self, RenderTextBox(self.size, self.bGColour1, self.text, self.textSize, self.textColour, self.font, self.textOffset))
 
     def UpdateText(self, text):
         # updates sprite to display new text
 
-        image = pyg.Surface(self.size.Tuple())
-        image.fill(self.bGColour1)
-        fontObj = pyg.font.SysFont(self.font, self.textSize)
-        textObj = fontObj.render(text, True, self.textColour)
-        image.blit(textObj, self.textOffset.Tuple())
-
-        self.sprite = Sprite(self, image)
+        self.sprite.image = RenderTextBox(self.size, self.bGColour1, text, self.textSize, self.textColour, self.font, self.textOffset)
 
 
 class Button(Box):
+    # box with text that is pressed by clicking it. The scene's UIIndex sends it mouse clicks, and callbacks added to onPressed,
+    # onReleasedIn, and onReleasedOut are called with the button when it is pressed, and when the mouse is released in or out of it
+
     def __init__(self, scene, position, size, bGColour1, bGColour2, text, textSize, textColour, font, textOffset):
         super().__init__(scene, position, size, bGColour1)
 
         self.pressed = False
-        self.releasedIn = False
-        self.releasedOut = False
         self.colourSwapEnabled =True
+        self.interactable = True
+
+        self.onPressed = []
+        self.onReleasedIn = []
+        self.onReleasedOut = []
 
-        self.scripts = [CheckPressed(self), CheckReleased(self)]
+        #tick the button was last released on and whether the mouse was inside it, see releasedIn and releasedOut
+        self.releasedTick = None
+        self.releasedInside = False
 
         self.bGColour1 = bGColour1
         self.bGColour2 = bGColour2
@@ -375,78 +3433,113 @@ class Button(Box):
         self.font = font
         self.textOffset = textOffset
 
+        #the images for both background colours are made once, pressing and releasing the button swaps between them
+        self.images = {}
         self.sprite = self.CreateSprite(self.bGColour1)
+        self.GetImage(self.bGColour2)
+
+        scene.uiIndex.Add(self)
 
     def DisableButton(self):
         # disables the button to be pressed
 
         self.colourSwapEnabled = False
-        self.sprite = self.CreateSprite(self.bGColour1)
+        self.SetColour(self.bGColour1)
 
+    def Enable(self):
+        super().Enable()
+        self.interactable = True
 
-    def CreateSprite(self, colour):
-        # creates a new sprite with a different background colour
+    def Disable(self):
+        super().Disable()
+        self.interactable = False
 
-        sprite = pyg.Surface(self.size.Tuple())
-        sprite.fill(colour)
-        fontObj = pyg.font.SysFont(self.font, self.textSize)
-        textObj = fontObj.render(self.text, True, self.textColour)
-        sprite.blit(textObj, self.textOffset.Tuple())
+    def Contains(self, position):
+        # returns True if position is inside the button
+        topLeft = self.transform.position
 
-        return Sprite(self, sprite)
+        if position.x > topLeft.x and position.x < topLeft.x + self.size.x:
+            if position.y > topLeft.y and position.y < topLeft.y + self.size.y:
+                return True
 
-    def Reset(self):
-        #sets the sprite colour to the initial background colour
+        return False
 
-        self.sprite = self.CreateSprite(self.bGColour1)
+    def OnMouseDown(self):
+        if not self.interactable or self.pressed:
+            return
 
+        self.pressed = True
 
-class CheckPressed(Script):
-    #Script to be attached to a Button object. Checks if the button is pressed by the mouse
+        if self.colourSwapEnabled:
+            self.SetColour(self.bGColour2)
 
-    def __init__(self, parent):
-        super().__init__(parent)
+        for callback in list(self.onPressed):
+            callback(self)
 
-    def Update(self):
-        parent = self.parent
-        gM = parent.gameManager
+    def OnMouseUp(self, inside):
+        if not self.pressed:
+            return
 
-        if parent.pressed == False:
-            if gM.mouseDown == True:
-                if gM.mousePos.x > parent.transform.position.x and gM.mousePos.x < parent.transform.position.x + parent.size.x:
-                    if gM.mousePos.y > parent.transform.position.y and gM.mousePos.y < parent.transform.position.y + parent.size.y:
-                        parent.pressed = True
+        self.pressed = False
+        self.releasedTick = self.gameManager.tick
+        self.releasedInside = inside
 
-                        if parent.colourSwapEnabled:
-                            parent.sprite = parent.CreateSprite(parent.bGColour2)
+        if self.colourSwapEnabled:
+            self.SetColour(self.bGColour1)
 
+        for callback in list(self.onReleasedIn if inside else self.onReleasedOut):
+            callback(self)
 
-class CheckReleased(Script):
-    # Script to be attached to a Button object. Checks if the mouse is released in or out of the button.
+    @property
+    def releasedIn(self):
+        # True during the first tick after the mouse was released inside the button. Kept for scripts that poll the button,
+        # new scripts should add a callback to onReleasedIn instead
+        return self.releasedTick == self.gameManager.tick and self.releasedInside
 
-    def __init__(self, parent):
-        super().__init__(parent)
+    @property
+    def releasedOut(self):
+        return self.releasedTick == self.gameManager.tick and not self.releasedInside
 
-    def Update(self):
-        parent = self.parent
-        gM = parent.gameManager
+    def GetImage(self, colour):
+        # returns the button image with the given background colour
+        image = self.images.get(colour)
+
+        if image == None:
+            image = RenderTextBox(self.size, colour, self.text, self.textSize, self.textColour, self.font, self.textOffset)
+            self.images[colour] = image
+
+        return image
+
+    def CreateSprite(self, colour):
+        # creates a new sprite with a different background colour
+
+        return Sprite(self, self.GetImage(colour))
+
+    def SetColour(self, colour):
+        # swaps the image of the current sprite for the one with the given background colour
 
-        parent.releasedIn = False
-        parent.releasedOut = False
+        self.sprite.image = self.GetImage(colour)
 
-        if parent.pressed:
-            if gM.mouseDown == False:
-                parent.releasedOut = True
-                parent.pressed = False
+    def Reset(self):
+        #releases the button without calling its callbacks and sets the sprite colour to the initial background colour
+
+        self.pressed = False
+        self.SetColour(self.bGColour1)
+
+
+class CheckPressed(Script):
+    # Buttons are pressed through the scene's UIIndex, so this script does nothing. Kept so that code which adds it to a Button still runs
+
+    def __init__(self, parent):
+        super().__init__(parent)
 
 
-                if parent.colourSwapEnabled:
-                    parent.sprite = parent.CreateSprite(parent.bGColour1)
+class CheckReleased(Script):
+    # Buttons are released through the scene's UIIndex and set releasedIn and releasedOut themselves, so this script does nothing.
+    # Kept so that code which adds it to a Button still runs
 
-                if gM.mousePos.x > parent.transform.position.x and gM.mousePos.x < parent.transform.position.x + parent.size.x:
-                    if gM.mousePos.y > parent.transform.position.y and gM.mousePos.y < parent.transform.position.y + parent.size.y:
-                        parent.releasedOut = False
-                        parent.releasedIn = True
+    def __init__(self, parent):
+        super().__init__(parent)
 
 
 class OnButtonPressedChangeScene(Script):
@@ -456,10 +3549,11 @@ class OnButtonPressedChangeScene(Script):
         super().__init__(parent)
 
         self.newScene = newScene
+        parent.onReleasedIn.append(self.OnReleasedIn)
 
-    def Update(self):
-        if self.parent.releasedIn == True:
-            self.parent.scene.gameManager.ChangeScene(self.newScene)
+    def OnReleasedIn(self, button):
+        if self.enabled:
+            self.parent.scene.gameManager.LoadScene(self.newScene)
 
 
 class Counter(TextBox):
@@ -470,9 +3564,54 @@ class Counter(TextBox):
 
         self.count = initialCount
 
+        #callbacks called with the counter each time its count is updated
+        self.onChanged = []
+
     def UpdateCount(self):
         super().UpdateText(str(self.count))
 
+        for callback in list(self.onChanged):
+            callback(self)
+
+
+class LoadingScene(Scene):
+    # shown by GameManager.LoadScene() while a scene is built on the loading thread. A box slides back and forth along a track
+
+    def __init__(self, gameManager):
+        super().__init__(gameManager)
+
+        trackSize = Vector2(200, 10)
+        trackPosition = gameManager.screenSize / 2 - trackSize / 2
+        Box(self, trackPosition, trackSize, Colour.grey)
+
+        indicatorSize = Vector2(40, 10)
+        indicator = Box(self, trackPosition, indicatorSize, Colour.white)
+        indicator.sprite.layer = 1
+        indicator.scripts.append(LoadingIndicator(indicator, trackPosition.x, trackSize.x - indicatorSize.x))
+
+
+class LoadingIndicator(Script):
+    # moves its parent back and forth between start and start + distance
+
+    speed = 10
+
+    def __init__(self, parent, start, distance):
+        super().__init__(parent)
+
+        self.start = start
+        self.distance = distance
+        self.offset = 0
+
+    def Update(self):
+        self.offset = (self.offset + LoadingIndicator.speed) % (2 * self.distance)
+
+        if self.offset < self.distance:
+            x = self.start + self.offset
+        else:
+            x = self.start + 2 * self.distance - self.offset
+
+        self.parent.transform.position = Vector2(x, self.parent.transform.position.y)
+
 
 class Colour:
     white = (255, 255, 255)
@@ -489,6 +3628,7 @@ class Colour:
 
 
     @staticmethod
-    def Random():
+    def Random(rand = random):
+        # returns a random colour using rand, which is the random module or a random.Random such as a scene's random
         colours = [Colour.green, Colour.blue, Colour.red, Colour.yellow, Colour.turqoise, Colour.orange, Colour.pink, Colour.purple]
-        return colours[random.randint(0, len(colours) -1)]
+        return colours[rand.randint(0, len(colours) -1)]
@@ -1,3 +1,5 @@
+import asyncio
+import sys
 import pygame as pyg
 from PongFramework import *
 
@@ -8,57 +10,23 @@ screenSize = Vector2(1400, 800)
 screenCaption = "Pong"
 allowedEvents = [pyg.QUIT, pyg.MOUSEBUTTONUP, pyg.MOUSEBUTTONDOWN, pyg.MOUSEMOTION, pyg.KEYDOWN, pyg.KEYUP]
 
-fps = 30
+#physics and scripts run at tickRate, the screen is drawn at fps
+tickRate = 30
+fps = 60
 
 GM = PongGM(screenSize, screenCaption, allowedEvents)
 GM.winBGColour = Colour.black
+GM.tickRate = tickRate
 
+#python Main.py session.rec records the input of the session to a file, which Replay.py can run again headlessly
+recordPath = sys.argv[1] if len(sys.argv) > 1 else None
+if recordPath != None:
+    recorder = InputRecorder(GM)
 
+#main game loop. Scenes that are not ready are built on a loading thread while a loading scene is shown
+asyncio.run(GM.RunAsync(fps))
 
-#main game loop
-while True:
-    GM.clock.tick(fps)
+if recordPath != None:
+    recorder.Stop().Save(recordPath)
 
-    #check for pygame events
-    for event in pyg.event.get():
-        if event.type == pyg.QUIT:
-            sys.exit()
-        elif event.type == pyg.MOUSEMOTION:
-            mouseX, mouseY = event.pos
-            GM.mousePos = Vector2(mouseX, mouseY)
-        elif event.type == pyg.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                mouseX, mouseY = event.pos
-                GM.mousePos = Vector2(mouseX, mouseY)
-                GM.mouseDown = True
-        elif event.type == pyg.MOUSEBUTTONUP:
-            if event.button == 1:
-                mouseX, mouseY = event.pos
-                GM.mousePos = Vector2(mouseX, mouseY)
-                GM.mouseDown = False
-        elif event.type == pyg.KEYDOWN:
-            if event.key == pyg.K_ESCAPE:
-                sys.exit()
-            elif event.key == pyg.K_w:
-                GM.wDown = True
-            elif event.key == pyg.K_s:
-                GM.sDown = True
-            elif event.key == pyg.K_UP:
-                GM.upDown = True
-            elif event.key == pyg.K_DOWN:
-                GM.downDown = True
-        elif event.type == pyg.KEYUP:
-            if event.key == pyg.K_w:
-                GM.wDown = False
-            elif event.key == pyg.K_s:
-                GM.sDown = False
-            elif event.key == pyg.K_UP:
-                GM.upDown = False
-            elif event.key == pyg.K_DOWN:
-                GM.downDown = False
-
-    GM.UpdateScripts()
-    GM.CastRigidBodies()
-    GM.UpdateCollisions()
-    GM.MoveRigidBodies()
-    GM.UpdateWindow()
+pyg.quit()
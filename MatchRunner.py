@@ -0,0 +1,191 @@
+import os
+
+#matches are run without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import multiprocessing
+import time
+from PongFramework import *
+
+"""
+Runs many independent headless TwoPlayer matches across a pool of processes. Each match has its own game manager, a seed that
+makes it reproducible, and scripted inputs that press the paddle actions. The result of each match is streamed back to the parent
+process as soon as it finishes.
+
+    python MatchRunner.py --matches 200 --inputs random --max-score 5
+"""
+
+screenSize = Vector2(1400, 800)
+
+
+class IdleInput:
+    #never presses anything
+
+    def __init__(self, seed):
+        pass
+
+    def Update(self, gameManager, scene):
+        pass
+
+
+class RandomInput:
+    #each paddle picks up, down, or no movement at random every holdTicks ticks
+
+    holdTicks = 15
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def Update(self, gameManager, scene):
+        if gameManager.tick % RandomInput.holdTicks != 0:
+            return
+
+        for player in (1, 2):
+            choice = self.random.randrange(3)
+            gameManager.input.SetAction("player {} up".format(player), choice == 0)
+            gameManager.input.SetAction("player {} down".format(player), choice == 1)
+
+
+class FollowInput:
+    #each paddle follows the puck while it is moving towards the paddle, and stops while it is moving away
+
+    def __init__(self, seed):
+        pass
+
+    def Update(self, gameManager, scene):
+        puck = scene.puck
+        puckY = puck.transform.position.y + puck.collider.size.y / 2
+
+        for player, paddle, direction in ((1, scene.paddleLeft, -1), (2, scene.paddleRight, 1)):
+            approaching = puck.rigidBody.velocity.x * direction > 0
+            top = paddle.transform.position.y
+            bottom = top + paddle.collider.size.y
+
+            gameManager.input.SetAction("player {} up".format(player), approaching and puckY < top)
+            gameManager.input.SetAction("player {} down".format(player), approaching and puckY > bottom)
+
+
+class ScriptedInput:
+    #presses and releases actions at set ticks. events is a list of (tick, action, pressed)
+
+    def __init__(self, seed, events):
+        self.events = sorted(events, key=lambda event: event[0])
+        self.index = 0
+
+    def Update(self, gameManager, scene):
+        while self.index < len(self.events) and self.events[self.index][0] <= gameManager.tick:
+            tick, action, pressed = self.events[self.index]
+            gameManager.input.SetAction(action, pressed)
+            self.index += 1
+
+
+#name: class of the built in inputs
+inputs = {"idle": IdleInput, "random": RandomInput, "follow": FollowInput}
+
+
+def CreateInput(inputSettings, seed):
+    # returns the input for a match from the name of a built in input or a list of (tick, action, pressed) events
+    if type(inputSettings) is str:
+        return inputs[inputSettings](seed)
+
+    return ScriptedInput(seed, inputSettings)
+
+
+def InitialiseWorker():
+    # called once in each process of the pool. Headless matches only need fonts for their text boxes
+    pyg.font.init()
+
+
+def RunMatch(match):
+    # runs a match until a player reaches the max score or maxTicks ticks have run, and returns its result.
+    # match is a dict of the seed, inputs, maxScore, and maxTicks
+    seed = match["seed"]
+    gameManager = PongGM(screenSize, "Match", [], headless=True, seed=seed)
+    gameManager.ChangeScene("two player")
+    scene = gameManager.currentScene
+    scene.scoreKeeper.maxScore = match["maxScore"]
+
+    matchInput = CreateInput(match["inputs"], seed)
+    tickTimes = []
+    startTime = time.perf_counter()
+
+    #the score keeper changes to the end menu when the match is won
+    while gameManager.currentScene is scene and gameManager.tick < match["maxTicks"]:
+        start = time.perf_counter()
+        matchInput.Update(gameManager, scene)
+        gameManager.Tick()
+        tickTimes.append(time.perf_counter() - start)
+
+    duration = time.perf_counter() - startTime
+    scores = (scene.scoreLeft.count, scene.scoreRight.count)
+
+    if gameManager.currentScene is scene:
+        winner = None
+    else:
+        winner = 1 if scores[0] == match["maxScore"] else 2
+
+    tickTimes.sort()
+    return {
+        "seed": seed,
+        "winner": winner,
+        "scores": scores,
+        "ticks": gameManager.tick,
+        "meanTickMs": duration / max(1, len(tickTimes)) * 1000,
+        "p99TickMs": tickTimes[min(len(tickTimes) - 1, math.ceil(0.99 * len(tickTimes)) - 1)] * 1000 if tickTimes != [] else 0,
+        "pid": os.getpid(),
+    }
+
+
+def RunMatches(matches, processes = None):
+    # runs each match in a pool of processes and yields each result as soon as its match finishes, so results are not in the order of matches.
+    # processes defaults to the number of cores
+    with multiprocessing.Pool(processes, initializer=InitialiseWorker) as pool:
+        for result in pool.imap_unordered(RunMatch, matches):
+            yield result
+
+
+def CreateMatches(count, seed, inputSettings, maxScore, maxTicks):
+    # returns count matches with consecutive seeds starting from seed
+    return [{"seed": seed + i, "inputs": inputSettings, "maxScore": maxScore, "maxTicks": maxTicks} for i in range(count)]
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Runs headless TwoPlayer matches across a pool of processes")
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None, help="number of processes, defaults to the number of cores")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match, each match after it uses the next seed")
+    parser.add_argument("--inputs", default="random", choices=list(inputs))
+    parser.add_argument("--max-score", type=int, default=5)
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    parser.add_argument("--output", help="write each result as a line of JSON to this file")
+    args = parser.parse_args()
+
+    matches = CreateMatches(args.matches, args.seed, args.inputs, args.max_score, args.max_ticks)
+    outputFile = open(args.output, "w") if args.output != None else None
+
+    wins = {1: 0, 2: 0, None: 0}
+    ticks = 0
+    startTime = time.perf_counter()
+
+    for result in RunMatches(matches, args.processes):
+        line = json.dumps(result)
+        print(line)
+        if outputFile != None:
+            outputFile.write(line + "\n")
+
+        wins[result["winner"]] += 1
+        ticks += result["ticks"]
+
+    duration = time.perf_counter() - startTime
+    if outputFile != None:
+        outputFile.close()
+
+    print("{} matches in {:.2f}s, {:.0f} ticks/s. Player 1 won {}, player 2 won {}, {} unfinished".format(
+        len(matches), duration, ticks / duration, wins[1], wins[2], wins[None]))
+
+
+if __name__ == "__main__":
+    Main()
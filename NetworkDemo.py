@@ -0,0 +1,220 @@
+import os
+import sys
+
+#the server and the demo's clients run without a window
+if len(sys.argv) < 2 or sys.argv[1] != "client":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import multiprocessing
+import time
+from PongFramework import *
+from Networking import *
+
+"""
+Networked Pong over UDP on localhost. "demo" runs a headless server and two headless clients whose players follow the puck, each in
+its own process, and reports the bandwidth each client used and how far its predictions were corrected. Packet loss and latency can
+be simulated. "server" runs a server on its own, and "client" connects to one with a window that is played with the keyboard.
+The server only accepts clients on the same machine unless it is bound to another address, like 0.0.0.0 for every interface.
+
+    python NetworkDemo.py demo --seconds 10 --loss 0.05 --latency 0.05 --decor 200
+    python NetworkDemo.py server --port 5000 --bind 0.0.0.0
+    python NetworkDemo.py client --host 192.168.1.10 --port 5000
+"""
+
+screenSize = Vector2(1400, 800)
+
+#the actions of each player's client
+playerActions = {1: ["player 1 up", "player 1 down"], 2: ["player 2 up", "player 2 down"]}
+
+#ticks the end menu is shown for before the server starts a new match
+endMenuTicks = 90
+
+
+def AddDecor(scene, count):
+    # adds count boxes that never move, which are only sent to each client in its first snapshot
+    for i in range(count):
+        Box(scene, Vector2(20 + (i * 37) % (screenSize.x - 40), 120 + (i * 53) % (screenSize.y - 240)), Vector2(4, 4), Colour.grey)
+
+    return scene
+
+
+def CreateGameManager(seed, decor, headless = True):
+    # returns a PongGM whose matches have decor extra boxes. The server and its clients build their scenes the same way
+    gameManager = PongGM(screenSize, "Networked Pong", [pyg.QUIT, pyg.KEYDOWN, pyg.KEYUP], headless, seed)
+    gameManager.RegisterScene("two player", lambda gameManager: AddDecor(TwoPlayer(gameManager), decor), preload=True)
+
+    return gameManager
+
+
+def GetPaddles(scene, player):
+    # returns the paddle a player's client predicts
+    if type(scene) is not TwoPlayer:
+        return []
+
+    return [scene.paddleLeft if player == 1 else scene.paddleRight]
+
+
+def FollowPuck(client):
+    # presses the client's actions so its paddle follows the puck as it is drawn on the client
+    scene = client.gameManager.currentScene
+    paddles = GetPaddles(scene, client.player)
+    if paddles == []:
+        return
+
+    puck = scene.puck
+    paddle = paddles[0]
+    puckY = puck.transform.position.y + puck.collider.size.y / 2
+
+    client.gameManager.input.SetAction(client.actions[0], puckY < paddle.transform.position.y)
+    client.gameManager.input.SetAction(client.actions[1], puckY > paddle.transform.position.y + paddle.collider.size.y)
+
+
+def RunServer(port, seed, decor, maxScore, seconds, loss, latency, results = None, bind = "127.0.0.1"):
+    # runs a headless server on the bind address, starting a new match endMenuTicks after each one ends. Puts its final scores in results
+    # if it is given
+    pyg.font.init()
+
+    gameManager = CreateGameManager(seed, decor)
+    gameManager.ChangeScene("two player")
+    gameManager.currentScene.scoreKeeper.maxScore = maxScore
+
+    server = NetworkServer(gameManager, playerActions, (bind, port), loss, latency, seed)
+    print("server listening on {}:{}".format(*server.address))
+
+    endTime = time.perf_counter() + seconds if seconds != None else None
+    nextTick = time.perf_counter()
+    endMenuStart = None
+
+    while endTime == None or time.perf_counter() < endTime:
+        server.Tick()
+
+        if type(gameManager.currentScene) is EndMenu:
+            if endMenuStart == None:
+                endMenuStart = gameManager.tick
+            elif gameManager.tick - endMenuStart >= endMenuTicks:
+                endMenuStart = None
+                gameManager.ChangeScene("two player")
+                gameManager.currentScene.scoreKeeper.maxScore = maxScore
+
+        nextTick += 1 / gameManager.tickRate
+        time.sleep(max(0, nextTick - time.perf_counter()))
+
+    scene = gameManager.currentScene
+    if results != None:
+        results.put(("server", {"ticks": gameManager.tick, "scene": type(scene).__name__,
+            "scores": (scene.scoreLeft.count, scene.scoreRight.count) if type(scene) is TwoPlayer else None,
+            "bytesSent": server.channel.bytesSent}))
+
+    server.Close()
+
+
+def RunBotClient(port, decor, seconds, loss, latency, seed, results):
+    # connects a headless client whose player follows the puck, and puts what it saw and the bandwidth it used in results
+    pyg.font.init()
+
+    client = NetworkClient(("127.0.0.1", port), loss=loss, latency=latency, seed=seed)
+    welcome = client.Connect()
+
+    gameManager = CreateGameManager(welcome["seed"], decor)
+    client.Attach(gameManager, GetPaddles)
+
+    startTime = time.perf_counter()
+    while time.perf_counter() - startTime < seconds:
+        FollowPuck(client)
+        client.Update()
+        time.sleep(0.004)
+
+    scene = gameManager.currentScene
+    channel = client.channel
+    results.put(("player {}".format(client.player), {
+        "scene": type(scene).__name__,
+        "scores": (scene.scoreLeft.count, scene.scoreRight.count) if type(scene) is TwoPlayer else None,
+        "bytesPerSecond": channel.bytesReceived / seconds,
+        "bytesPerSnapshot": channel.bytesReceived / max(1, channel.packetsReceived),
+        "snapshots": channel.packetsReceived,
+        "meanCorrection": client.predictionError / max(1, channel.packetsReceived),
+    }))
+
+    client.Close()
+
+
+def RunDemo(args):
+    results = multiprocessing.Queue()
+
+    server = multiprocessing.Process(target=RunServer, args=(args.port, args.seed, args.decor, args.max_score, args.seconds + 1, args.loss, args.latency, results))
+    server.start()
+    time.sleep(1)
+
+    #the clients keep running for a second after the server stops, so that they receive its last snapshots
+    clients = [multiprocessing.Process(target=RunBotClient, args=(args.port, args.decor, args.seconds + 1, args.loss, args.latency, args.seed + i, results)) for i in range(2)]
+    for client in clients:
+        client.start()
+
+    reports = dict(results.get() for _ in range(3))
+    for process in clients + [server]:
+        process.join()
+
+    for name in sorted(reports):
+        print(name, json.dumps(reports[name]))
+
+    #each client shows the last state the server sent it
+    server = reports["server"]
+    for player in (1, 2):
+        report = reports.get("player {}".format(player))
+        if report != None:
+            matches = report["scene"] == server["scene"] and report["scores"] == server["scores"]
+            print("player {} {} the server's final state".format(player, "matches" if matches else "does not match"))
+
+
+def RunWindowedClient(args):
+    # connects a client with a window. The keys of the player the server gives the client move its paddle
+    pyg.init()
+
+    client = NetworkClient((args.host, args.port), loss=args.loss, latency=args.latency)
+    welcome = client.Connect()
+    print("connected as player {}".format(welcome["player"]))
+
+    gameManager = CreateGameManager(welcome["seed"], args.decor, headless=False)
+    gameManager.winBGColour = Colour.black
+    gameManager.interpolate = False
+    client.Attach(gameManager, GetPaddles)
+
+    gameManager.running = True
+    while gameManager.running:
+        gameManager.clock.tick(60)
+
+        for event in pyg.event.get():
+            gameManager.HandleEvent(event)
+
+        client.Update()
+        gameManager.UpdateWindow()
+
+    client.Close()
+    pyg.quit()
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Networked Pong over UDP")
+    parser.add_argument("mode", nargs="?", default="demo", choices=["demo", "server", "client"])
+    parser.add_argument("--host", default="127.0.0.1", help="address of the server the client connects to")
+    parser.add_argument("--bind", default="127.0.0.1", help="address the server listens on, 0.0.0.0 for every interface")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=10, help="how long the demo runs")
+    parser.add_argument("--max-score", type=int, default=3)
+    parser.add_argument("--decor", type=int, default=0, help="boxes that never move added to each match")
+    parser.add_argument("--loss", type=float, default=0, help="fraction of packets dropped")
+    parser.add_argument("--latency", type=float, default=0, help="seconds each packet is delayed by")
+    args = parser.parse_args()
+
+    if args.mode == "demo":
+        RunDemo(args)
+    elif args.mode == "server":
+        RunServer(args.port, args.seed, args.decor, args.max_score, None, args.loss, args.latency, bind=args.bind)
+    else:
+        RunWindowedClient(args)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,850 @@
+import json
+import math
+import random
+import socket
+import time
+from collections import deque
+from GameFramework import *
+
+"""
+Networked multiplayer over UDP. A NetworkServer runs the game and sends each client snapshots of the current scene: the position
+and velocity of each game object and the count of each Counter, quantized to integers. Each snapshot only holds the objects that
+changed since the last snapshot the client acknowledged, so bandwidth grows with the number of objects that move rather than the
+number of objects in the scene. A NetworkClient mirrors the server's scene, draws other objects interpolated between snapshots,
+and predicts the objects it controls from its own input, correcting them when the server's state for that input arrives.
+
+Game objects are matched between server and client by their sceneOrder, so the client must build its scenes the same way the
+server does, from the same registered scene names. Game objects the client does not have are skipped, and game objects the server
+removes from its scene are removed from the client's.
+"""
+
+
+class UDPChannel:
+    # non-blocking UDP socket. loss drops that fraction of sent packets and latency delays them by that many seconds, so that
+    # bad networks can be tested over localhost
+
+    maxPacketSize = 65507
+
+    def __init__(self, address = ("127.0.0.1", 0), loss = 0, latency = 0, seed = None):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+
+        self.loss = loss
+        self.latency = latency
+        self.random = random.Random(seed)
+
+        #(time to send, data, address) of each delayed packet
+        self.delayed = deque()
+
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.packetsSent = 0
+        self.packetsReceived = 0
+
+    def Send(self, data, address):
+        self.bytesSent += len(data)
+        self.packetsSent += 1
+
+        if self.loss > 0 and self.random.random() < self.loss:
+            return
+
+        if self.latency > 0:
+            self.delayed.append((time.perf_counter() + self.latency, data, address))
+        else:
+            self.socket.sendto(data, address)
+
+    def Flush(self):
+        # sends the delayed packets that are due
+        now = time.perf_counter()
+
+        while len(self.delayed) > 0 and self.delayed[0][0] <= now:
+            sendTime, data, address = self.delayed.popleft()
+            self.socket.sendto(data, address)
+
+    def Receive(self):
+        # returns a list of (data, address) of each packet that has arrived
+        self.Flush()
+        packets = []
+
+        while True:
+            try:
+                data, address = self.socket.recvfrom(UDPChannel.maxPacketSize)
+            except (BlockingIOError, ConnectionResetError):
+                break
+
+            self.bytesReceived += len(data)
+            self.packetsReceived += 1
+            packets.append((data, address))
+
+        return packets
+
+    def Close(self):
+        self.socket.close()
+
+
+class Snapshot:
+    # the quantized state of a scene on a tick. states maps the sceneOrder of each game object to (x, y, velocity x, velocity y, count),
+    # with 0 for the fields a game object does not have
+
+    magic = b"PGNT"
+    version = 2
+
+    #message types, the first byte of each packet
+    hello = 0
+    welcome = 1
+    input = 2
+    snapshot = 3
+    bye = 4
+
+    #bits of the fields of a state that changed
+    positionField = 1
+    velocityField = 2
+    countField = 4
+
+    #positions are sent in eighths of a pixel and velocities in 64ths of a pixel per tick
+    positionScale = 8
+    velocityScale = 64
+
+    def __init__(self, tick, sceneNumber, sceneName, sceneArgs, states):
+        self.tick = tick
+        self.sceneNumber = sceneNumber
+        self.sceneName = sceneName
+        self.sceneArgs = sceneArgs
+        self.states = states
+
+    @staticmethod
+    def GetStates(scene):
+        states = {}
+
+        for gameObject in scene.gameObjects:
+            position = gameObject.transform.position
+            x = round(position.x * Snapshot.positionScale)
+            y = round(position.y * Snapshot.positionScale)
+
+            velocityX = velocityY = 0
+            if gameObject.rigidBody != None:
+                velocity = gameObject.rigidBody.velocity
+                velocityX = round(velocity.x * Snapshot.velocityScale)
+                velocityY = round(velocity.y * Snapshot.velocityScale)
+
+            count = gameObject.count if isinstance(gameObject, Counter) else 0
+
+            states[gameObject.sceneOrder] = (x, y, velocityX, velocityY, count)
+
+        return states
+
+    @staticmethod
+    def ZigZag(value):
+        # maps signed values to unsigned ones so that small negative values are also short varints
+        return value * 2 if value >= 0 else -value * 2 - 1
+
+    @staticmethod
+    def UnZigZag(value):
+        return value >> 1 if value & 1 == 0 else -(value >> 1) - 1
+
+    def Encode(self, baseline, inputSequence):
+        # returns the snapshot as a packet holding only the states that differ from baseline, the snapshot the client acknowledged, or
+        # every state if baseline is None. inputSequence is the last input of the client that was applied, or -1
+        data = WriteHeader(Snapshot.snapshot)
+        WriteVarint = InputRecording.WriteVarint
+        ZigZag = Snapshot.ZigZag
+
+        WriteVarint(data, self.tick)
+        WriteVarint(data, baseline.tick + 1 if baseline != None else 0)
+        WriteVarint(data, inputSequence + 1)
+        WriteVarint(data, self.sceneNumber)
+
+        #the scene is only described to clients that may not have changed to it yet
+        if baseline == None or baseline.sceneNumber != self.sceneNumber:
+            sceneInfo = json.dumps([self.sceneName, list(self.sceneArgs)]).encode()
+            WriteVarint(data, len(sceneInfo) + 1)
+            data += sceneInfo
+        else:
+            WriteVarint(data, 0)
+
+        baseStates = baseline.states if baseline != None else {}
+        changed = [(objectId, state) for objectId, state in self.states.items() if baseStates.get(objectId) != state]
+        changed.sort()
+
+        WriteVarint(data, len(changed))
+        previousId = 0
+        empty = (0, 0, 0, 0, 0)
+
+        for objectId, state in changed:
+            base = baseStates.get(objectId, empty)
+
+            fields = 0
+            if state[0] != base[0] or state[1] != base[1]:
+                fields |= Snapshot.positionField
+            if state[2] != base[2] or state[3] != base[3]:
+                fields |= Snapshot.velocityField
+            if state[4] != base[4]:
+                fields |= Snapshot.countField
+
+            #ids are sorted, so each is sent as the gap from the last
+            WriteVarint(data, objectId - previousId)
+            previousId = objectId
+            data.append(fields)
+
+            #each field is sent as its change from the baseline
+            if fields & Snapshot.positionField:
+                WriteVarint(data, ZigZag(state[0] - base[0]))
+                WriteVarint(data, ZigZag(state[1] - base[1]))
+            if fields & Snapshot.velocityField:
+                WriteVarint(data, ZigZag(state[2] - base[2]))
+                WriteVarint(data, ZigZag(state[3] - base[3]))
+            if fields & Snapshot.countField:
+                WriteVarint(data, ZigZag(state[4] - base[4]))
+
+        #game objects in the baseline that were removed from the scene, or that were in the baseline's scene
+        removed = sorted(objectId for objectId in baseStates if objectId not in self.states)
+        WriteVarint(data, len(removed))
+        previousId = 0
+
+        for objectId in removed:
+            WriteVarint(data, objectId - previousId)
+            previousId = objectId
+
+        return bytes(data)
+
+    @staticmethod
+    def Decode(data, baselines):
+        # returns (snapshot, inputSequence) from a packet made by Encode(). baselines maps ticks to the snapshots the client has.
+        # Returns None if the snapshot's baseline is not one of them. Raises IndexError or ValueError if the packet is short or malformed
+        ReadVarint = InputRecording.ReadVarint
+        UnZigZag = Snapshot.UnZigZag
+        index = 6
+
+        tick, index = ReadVarint(data, index)
+        baselineTick, index = ReadVarint(data, index)
+        inputSequence, index = ReadVarint(data, index)
+        sceneNumber, index = ReadVarint(data, index)
+        sceneInfoLength, index = ReadVarint(data, index)
+
+        if baselineTick == 0:
+            baseline = None
+        else:
+            baseline = baselines.get(baselineTick - 1)
+            if baseline == None:
+                return None
+
+        if sceneInfoLength > 0:
+            if index + sceneInfoLength - 1 > len(data):
+                raise ValueError("scene info is longer than the packet")
+
+            sceneInfo = json.loads(bytes(data[index:index + sceneInfoLength - 1]).decode())
+            index += sceneInfoLength - 1
+
+            if type(sceneInfo) is not list or len(sceneInfo) != 2 or type(sceneInfo[0]) not in (str, type(None)) or type(sceneInfo[1]) is not list:
+                raise ValueError("bad scene info")
+            sceneName, sceneArgs = sceneInfo
+        elif baseline != None:
+            sceneName, sceneArgs = baseline.sceneName, baseline.sceneArgs
+        else:
+            raise ValueError("a snapshot without a baseline must describe its scene")
+
+        states = dict(baseline.states) if baseline != None else {}
+        count, index = ReadVarint(data, index)
+
+        #each state takes at least two bytes, its id gap and its fields
+        if count > (len(data) - index) // 2:
+            raise ValueError("more states than fit in the packet")
+        objectId = 0
+        empty = (0, 0, 0, 0, 0)
+
+        for _ in range(count):
+            gap, index = ReadVarint(data, index)
+            objectId += gap
+            fields = data[index]
+            index += 1
+
+            state = list(states.get(objectId, empty))
+
+            if fields & Snapshot.positionField:
+                change, index = ReadVarint(data, index)
+                state[0] += UnZigZag(change)
+                change, index = ReadVarint(data, index)
+                state[1] += UnZigZag(change)
+            if fields & Snapshot.velocityField:
+                change, index = ReadVarint(data, index)
+                state[2] += UnZigZag(change)
+                change, index = ReadVarint(data, index)
+                state[3] += UnZigZag(change)
+            if fields & Snapshot.countField:
+                change, index = ReadVarint(data, index)
+                state[4] += UnZigZag(change)
+
+            states[objectId] = tuple(state)
+
+        count, index = ReadVarint(data, index)
+        if count > len(data) - index:
+            raise ValueError("more removed ids than fit in the packet")
+
+        objectId = 0
+        for _ in range(count):
+            gap, index = ReadVarint(data, index)
+            objectId += gap
+            states.pop(objectId, None)
+
+        return Snapshot(tick, sceneNumber, sceneName, tuple(sceneArgs), states), inputSequence - 1
+
+
+def WriteHeader(messageType):
+    return bytearray([messageType]) + Snapshot.magic + bytes([Snapshot.version])
+
+
+def ReadHeader(data):
+    # returns the message type of a packet, or None if it is not from a compatible client or server
+    if len(data) < 6 or data[1:5] != Snapshot.magic or data[5] != Snapshot.version:
+        return None
+    return data[0]
+
+
+def PredictStep(gameManager, gameObject):
+    # runs the scripts of gameObject and moves its rigid body like a tick of GameManager, only testing it against static colliders.
+    # Used by clients to predict the game objects they control
+    scene = gameObject.scene
+
+    for script in list(gameObject.scripts):
+        if script.enabled and type(script).Update is not Script.Update and not ScriptScheduler.IsCoroutine(script):
+            script.Update()
+
+    rigidBody = gameObject.rigidBody
+    rigidBody.Cast()
+
+    collider = gameObject.collider
+    if collider == None:
+        gameObject.transform.position = rigidBody.castPosition
+        rigidBody.velocity.Set(0, 0)
+        return
+
+    staticColliderIndex = scene.staticColliderIndex
+    if staticColliderIndex.dirty:
+        staticColliderIndex.Build(scene.gameObjects)
+
+    collider.collisions = []
+    collider.sweptContacts = []
+    if rigidBody.continuous:
+        rigidBody.contactTime = 1
+
+    if collider.enabled:
+        for other in staticColliderIndex.QueryBounds(*gameManager.GetColliderBounds(gameObject)):
+            if gameManager.CanCollide(collider, other.collider):
+                gameManager.CheckForCollision(gameObject, other)
+
+        gameManager.ResolveSweptContacts(gameObject)
+
+    #the collisions are only used to decide whether the game object moves
+    blocked = collider.collisions != []
+    for other in collider.collisions:
+        other.collisions = []
+    collider.collisions = []
+
+    if not blocked:
+        gameObject.transform.position = rigidBody.castPosition
+
+
+class ClientConnection:
+    # the server's record of a connected client
+
+    def __init__(self, clientId, address, player, actions):
+        self.clientId = clientId
+        self.address = address
+        self.player = player
+        self.actions = actions
+
+        #sequence: bit mask of actions of each input that arrived and has not been applied
+        self.inputs = {}
+        self.inputSequence = -1
+        self.inputBits = 0
+
+        #tick of the last snapshot the client acknowledged, which the next snapshot is compared against
+        self.ackTick = None
+        self.connectedTime = time.perf_counter()
+        self.lastHeard = self.connectedTime
+
+
+class NetworkServer:
+    # runs gameManager's game for clients over UDP. playerActions maps each player number to the names of the input actions that
+    # player's client presses. Each client that connects is given the next free player
+
+    #snapshots kept as baselines for clients that acknowledge them
+    historySize = 64
+
+    #inputs that are allowed to queue up before the oldest are skipped, so a client's input cannot fall further and further behind
+    maxQueuedInputs = 4
+
+    #input packets holding more inputs than this are dropped, clients send NetworkClient.redundantInputs
+    maxInputsPerPacket = 32
+
+    #input sequences may run this many ticks ahead of the time the client has been connected for, to allow for clock drift
+    maxInputLead = 64
+
+    def __init__(self, gameManager, playerActions, address = ("127.0.0.1", 0), loss = 0, latency = 0, seed = None):
+        self.gameManager = gameManager
+        self.playerActions = playerActions
+        self.channel = UDPChannel(address, loss, latency, seed)
+        self.address = self.channel.address
+
+        #address: ClientConnection
+        self.clients = {}
+        self.nextClientId = 0
+
+        #clients that are not heard from for timeout seconds are disconnected
+        self.timeout = 5
+
+        #tick: Snapshot of the recent snapshots sent
+        self.history = {}
+
+        #number that changes each time the server's scene changes, so clients know to change scene
+        self.sceneNumber = 0
+        self.scene = None
+
+    def Receive(self):
+        for data, address in self.channel.Receive():
+            messageType = ReadHeader(data)
+
+            if messageType == Snapshot.hello:
+                self.OnHello(address)
+            elif messageType == Snapshot.input and address in self.clients:
+                #a short or malformed packet is dropped
+                try:
+                    self.OnInput(self.clients[address], data)
+                except (IndexError, ValueError):
+                    pass
+            elif messageType == Snapshot.bye and address in self.clients:
+                self.Disconnect(self.clients[address])
+
+        now = time.perf_counter()
+        for client in list(self.clients.values()):
+            if now - client.lastHeard > self.timeout:
+                self.Disconnect(client)
+
+    def OnHello(self, address):
+        client = self.clients.get(address)
+
+        if client == None:
+            usedPlayers = [client.player for client in self.clients.values()]
+            freePlayers = [player for player in self.playerActions if player not in usedPlayers]
+
+            #the game is full
+            if freePlayers == []:
+                return
+
+            client = ClientConnection(self.nextClientId, address, freePlayers[0], self.playerActions[freePlayers[0]])
+            self.clients[address] = client
+            self.nextClientId += 1
+
+        #a welcome that was lost is sent again when the client says hello again
+        gameManager = self.gameManager
+        welcome = {"client": client.clientId, "player": client.player, "actions": client.actions, "seed": gameManager.seed, "tickRate": gameManager.tickRate}
+        self.channel.Send(bytes(WriteHeader(Snapshot.welcome)) + json.dumps(welcome).encode(), address)
+
+    def OnInput(self, client, data):
+        # an input packet holds the client's acknowledged snapshot, its latest input sequence, and the bits of its last few inputs so that
+        # a lost packet is covered by the next. Raises IndexError or ValueError if the packet is short or malformed, before changing anything
+        ReadVarint = InputRecording.ReadVarint
+        now = time.perf_counter()
+
+        ackTick, index = ReadVarint(data, 6)
+        sequence, index = ReadVarint(data, index)
+        count, index = ReadVarint(data, index)
+
+        if ackTick - 1 > self.gameManager.tick:
+            raise ValueError("acknowledged a snapshot that was not sent")
+
+        #a sequence far ahead would make ApplyInputs() skip the client's real inputs
+        if count > NetworkServer.maxInputsPerPacket or count > sequence + 1:
+            raise ValueError("bad input count")
+        if sequence > (now - client.connectedTime) * self.gameManager.tickRate + NetworkServer.maxInputLead:
+            raise ValueError("input sequence is ahead of the client's time")
+
+        inputs = []
+        for i in range(count):
+            bits, index = ReadVarint(data, index)
+            inputs.append(bits)
+
+        client.lastHeard = now
+
+        if ackTick > 0 and (client.ackTick == None or ackTick - 1 > client.ackTick):
+            client.ackTick = ackTick - 1
+
+        for i, bits in enumerate(inputs):
+            inputSequence = sequence - count + 1 + i
+
+            if inputSequence > client.inputSequence:
+                client.inputs[inputSequence] = bits
+
+    def ApplyInputs(self):
+        # presses the actions of each client's next input. A client whose next input has not arrived keeps its last one
+        input = self.gameManager.input
+
+        for client in self.clients.values():
+            queued = sorted(client.inputs)
+            if len(queued) > NetworkServer.maxQueuedInputs:
+                for sequence in queued[:-NetworkServer.maxQueuedInputs]:
+                    del client.inputs[sequence]
+                client.inputSequence = queued[-NetworkServer.maxQueuedInputs] - 1
+
+            bits = client.inputs.pop(client.inputSequence + 1, None)
+            if bits != None:
+                client.inputSequence += 1
+                client.inputBits = bits
+
+            for bit, action in enumerate(client.actions):
+                input.SetAction(action, client.inputBits & 1 << bit != 0)
+
+    def Tick(self):
+        # receives the clients' packets, runs a tick with their input, and sends each client a snapshot
+        self.Receive()
+        self.ApplyInputs()
+        self.gameManager.Tick()
+        self.SendSnapshots()
+
+    def SendSnapshots(self):
+        gameManager = self.gameManager
+        scene = gameManager.currentScene
+
+        if scene is not self.scene:
+            self.scene = scene
+            self.sceneNumber += 1
+
+        snapshot = Snapshot(gameManager.tick, self.sceneNumber, scene.registeredName, scene.registeredArgs, Snapshot.GetStates(scene))
+        self.history[snapshot.tick] = snapshot
+        self.history.pop(snapshot.tick - NetworkServer.historySize, None)
+
+        for client in self.clients.values():
+            baseline = self.history.get(client.ackTick) if client.ackTick != None else None
+            self.channel.Send(snapshot.Encode(baseline, client.inputSequence), client.address)
+
+    def Run(self, maxTicks = None):
+        # runs ticks at the game manager's tick rate until it is quit or maxTicks ticks have run
+        gameManager = self.gameManager
+        gameManager.running = True
+        nextTick = time.perf_counter()
+
+        while gameManager.running and (maxTicks == None or gameManager.tick < maxTicks):
+            self.Tick()
+
+            nextTick += 1 / gameManager.tickRate
+            time.sleep(max(0, nextTick - time.perf_counter()))
+
+        gameManager.running = False
+
+    def Disconnect(self, client):
+        del self.clients[client.address]
+
+        for action in client.actions:
+            self.gameManager.input.SetAction(action, False)
+
+    def Close(self):
+        self.channel.Close()
+
+
+class NetworkClient:
+    # connects to a NetworkServer and mirrors its game. Call Connect(), create the game manager with the seed and tick rate of the welcome
+    # it returns, Attach() it, and call Update() every frame. predict(scene, player) returns the game objects the client controls in scene,
+    # which are moved by the client's own input instead of waiting for the server
+
+    #other game objects are drawn this many ticks behind the newest snapshot, so that there is usually a snapshot on each side to
+    #interpolate between
+    interpolationTicks = 3
+
+    #snapshots kept as baselines and for interpolation
+    historySize = 64
+
+    #inputs sent again in each input packet in case earlier packets were lost
+    redundantInputs = 8
+
+    #fields of the server's welcome
+    welcomeKeys = ("client", "player", "actions", "seed", "tickRate")
+
+    def __init__(self, serverAddress, address = ("0.0.0.0", 0), loss = 0, latency = 0, seed = None):
+        #packets are matched to the server by the address they came from, so a host name is looked up once here
+        self.serverAddress = (socket.gethostbyname(serverAddress[0]), serverAddress[1])
+        self.channel = UDPChannel(address, loss, latency, seed)
+
+        self.clientId = None
+        self.player = None
+        self.actions = []
+        self.welcome = None
+
+        self.gameManager = None
+        self.predict = None
+
+        #tick: Snapshot of the snapshots received, and the newest one
+        self.snapshots = {}
+        self.latestTick = None
+        self.latestTime = 0
+
+        #scene the client is showing, the server's game objects in it by sceneOrder, and the ones the client predicts
+        self.sceneNumber = None
+        self.objects = {}
+        self.predictedObjects = []
+
+        #(sequence, bits) of each input sent that the server has not applied
+        self.inputSequence = -1
+        self.pendingInputs = deque()
+        self.reconciledTick = None
+
+        self.accumulator = 0
+        self.previousTime = None
+        self.position = Vector2(0, 0)
+
+        #total distance predicted game objects were moved by when the server's state arrived
+        self.predictionError = 0
+
+    def Connect(self, timeout = 5):
+        # says hello until the server welcomes the client, and returns the welcome: its client id, player, actions, seed, and tickRate
+        endTime = time.perf_counter() + timeout
+        nextHello = 0
+
+        while time.perf_counter() < endTime:
+            if time.perf_counter() >= nextHello:
+                self.channel.Send(bytes(WriteHeader(Snapshot.hello)), self.serverAddress)
+                nextHello = time.perf_counter() + 0.25
+
+            for data, address in self.channel.Receive():
+                if address == self.serverAddress and ReadHeader(data) == Snapshot.welcome:
+                    #a malformed welcome is dropped, and the next hello asks for it again
+                    try:
+                        welcome = json.loads(bytes(data[6:]).decode())
+                    except ValueError:
+                        continue
+
+                    if type(welcome) is not dict or any(key not in welcome for key in NetworkClient.welcomeKeys) or type(welcome["actions"]) is not list:
+                        continue
+
+                    self.welcome = welcome
+                    self.clientId = welcome["client"]
+                    self.player = welcome["player"]
+                    self.actions = welcome["actions"]
+                    return self.welcome
+
+            time.sleep(0.005)
+
+        raise TimeoutError("no welcome from {}:{}".format(*self.serverAddress))
+
+    def Attach(self, gameManager, predict = None):
+        # mirrors the server's game in gameManager. The game manager's ticks are not run, the client only runs the scripts and physics
+        # of the game objects it predicts
+        self.gameManager = gameManager
+        self.predict = predict
+        gameManager.tickRate = self.welcome["tickRate"]
+
+    def Update(self):
+        # receives snapshots, runs the client's ticks that are due, and moves the game objects to where they are drawn this frame
+        now = time.perf_counter()
+        if self.previousTime == None:
+            self.previousTime = now
+
+        self.accumulator += now - self.previousTime
+        self.previousTime = now
+
+        for data, address in self.channel.Receive():
+            if address == self.serverAddress and ReadHeader(data) == Snapshot.snapshot:
+                self.OnSnapshot(data)
+
+        tickTime = 1 / self.gameManager.tickRate
+        ticks = 0
+        while self.accumulator >= tickTime:
+            self.accumulator -= tickTime
+            ticks += 1
+
+            #a client that fell far behind does not try to catch up
+            if ticks <= self.gameManager.maxSubsteps:
+                self.Tick()
+
+        self.Interpolate()
+
+    def OnSnapshot(self, data):
+        #a short or malformed packet is dropped
+        try:
+            decoded = Snapshot.Decode(data, self.snapshots)
+        except (IndexError, ValueError):
+            return
+
+        if decoded == None:
+            return
+
+        snapshot, inputSequence = decoded
+        if snapshot.tick in self.snapshots:
+            return
+
+        self.snapshots[snapshot.tick] = snapshot
+        for tick in [tick for tick in self.snapshots if tick <= snapshot.tick - NetworkClient.historySize]:
+            del self.snapshots[tick]
+
+        if self.latestTick == None or snapshot.tick > self.latestTick:
+            self.latestTick = snapshot.tick
+            self.latestTime = time.perf_counter()
+
+            if snapshot.sceneNumber != self.sceneNumber:
+                self.ChangeScene(snapshot)
+
+            self.RemoveObjects(snapshot)
+
+            self.Reconcile(snapshot, inputSequence)
+
+    def ChangeScene(self, snapshot):
+        self.sceneNumber = snapshot.sceneNumber
+        gameManager = self.gameManager
+
+        if snapshot.sceneName in gameManager.scenes:
+            gameManager.ChangeScene(snapshot.sceneName, *snapshot.sceneArgs)
+
+        scene = gameManager.currentScene
+        self.objects = {gameObject.sceneOrder: gameObject for gameObject in scene.gameObjects}
+        self.predictedObjects = list(self.predict(scene, self.player)) if self.predict != None else []
+
+    def RemoveObjects(self, snapshot):
+        # removes the game objects the server removed from the scene, which are no longer in its snapshots
+        removed = [objectId for objectId in self.objects if objectId not in snapshot.states]
+
+        for objectId in removed:
+            gameObject = self.objects.pop(objectId)
+            if gameObject.inScene:
+                gameObject.scene.RemoveGameObject(gameObject)
+
+            if gameObject in self.predictedObjects:
+                self.predictedObjects.remove(gameObject)
+
+    def Tick(self):
+        # sends the actions pressed this tick to the server, and moves the predicted game objects by them
+        input = self.gameManager.input
+        bits = 0
+        for bit, action in enumerate(self.actions):
+            if input.IsDown(action):
+                bits |= 1 << bit
+
+        self.inputSequence += 1
+        self.pendingInputs.append((self.inputSequence, bits))
+
+        recent = list(self.pendingInputs)[-NetworkClient.redundantInputs:]
+        data = WriteHeader(Snapshot.input)
+        InputRecording.WriteVarint(data, self.latestTick + 1 if self.latestTick != None else 0)
+        InputRecording.WriteVarint(data, self.inputSequence)
+        InputRecording.WriteVarint(data, len(recent))
+        for sequence, inputBits in recent:
+            InputRecording.WriteVarint(data, inputBits)
+        self.channel.Send(bytes(data), self.serverAddress)
+
+        for gameObject in self.predictedObjects:
+            PredictStep(self.gameManager, gameObject)
+
+    def Reconcile(self, snapshot, inputSequence):
+        # moves the predicted game objects to the server's state after the last input it applied, and predicts the inputs after it again
+        while len(self.pendingInputs) > 0 and self.pendingInputs[0][0] <= inputSequence:
+            self.pendingInputs.popleft()
+
+        if self.predictedObjects == []:
+            return
+
+        input = self.gameManager.input
+        pressed = [input.IsDown(action) for action in self.actions]
+        predicted = [(gameObject.transform.position.x, gameObject.transform.position.y) for gameObject in self.predictedObjects]
+
+        for gameObject in self.predictedObjects:
+            state = snapshot.states.get(gameObject.sceneOrder)
+            if state != None:
+                self.SetState(gameObject, state, state)
+
+        for sequence, bits in self.pendingInputs:
+            for bit, action in enumerate(self.actions):
+                input.SetAction(action, bits & 1 << bit != 0)
+
+            for gameObject in self.predictedObjects:
+                PredictStep(self.gameManager, gameObject)
+
+        for action, down in zip(self.actions, pressed):
+            input.SetAction(action, down)
+
+        for gameObject, (x, y) in zip(self.predictedObjects, predicted):
+            position = gameObject.transform.position
+            self.predictionError += math.hypot(position.x - x, position.y - y)
+
+    def Interpolate(self):
+        # moves each game object the client does not predict to its state interpolationTicks behind the server's estimated tick
+        if self.latestTick == None:
+            return
+
+        renderTick = self.latestTick + (time.perf_counter() - self.latestTime) * self.gameManager.tickRate - NetworkClient.interpolationTicks
+        ticks = sorted(tick for tick, snapshot in self.snapshots.items() if snapshot.sceneNumber == self.sceneNumber)
+        if ticks == []:
+            return
+
+        #the snapshots on each side of the tick drawn. The oldest or newest snapshot is held if there is nothing on one side
+        before = None
+        after = None
+        for tick in ticks:
+            if tick <= renderTick:
+                before = tick
+            else:
+                after = tick
+                break
+
+        if before == None:
+            before = after
+        if after == None:
+            after = before
+
+        fraction = (renderTick - before) / (after - before) if after != before else 1
+
+        beforeStates = self.snapshots[before].states
+        afterStates = self.snapshots[after].states
+        predicted = self.predictedObjects
+
+        for objectId, gameObject in self.objects.items():
+            beforeState = beforeStates.get(objectId)
+            afterState = afterStates.get(objectId)
+
+            if beforeState == None or afterState == None or gameObject in predicted:
+                continue
+
+            #a rigid body that moved further than its velocity allows was teleported, like a puck reset after a goal, so it is not drawn
+            #sliding between the two places
+            if fraction < 1 and gameObject.rigidBody != None and NetworkClient.Teleported(beforeState, afterState, after - before):
+                self.SetState(gameObject, beforeState, afterState)
+            else:
+                self.SetState(gameObject, beforeState, afterState, fraction)
+
+    @staticmethod
+    def Teleported(beforeState, afterState, ticks):
+        # returns True if the position changed by more on either axis than the faster of the two velocities moves in ticks, with a pixel to
+        # spare for rounding
+        scale = Snapshot.positionScale / Snapshot.velocityScale
+
+        for axis in (0, 1):
+            speed = max(abs(beforeState[axis + 2]), abs(afterState[axis + 2])) * scale
+            if abs(afterState[axis] - beforeState[axis]) > speed * ticks + Snapshot.positionScale:
+                return True
+
+        return False
+
+    def SetState(self, gameObject, beforeState, afterState, fraction = 1):
+        # sets the game object's state to fraction of the way from beforeState to afterState. Positions that did not change are not set, so
+        # static game objects are not moved
+        scale = Snapshot.positionScale
+        x = (beforeState[0] + (afterState[0] - beforeState[0]) * fraction) / scale
+        y = (beforeState[1] + (afterState[1] - beforeState[1]) * fraction) / scale
+
+        position = gameObject.transform.position
+        if x != position.x or y != position.y:
+            self.position.Set(x, y)
+            gameObject.transform.position = self.position
+
+        state = beforeState if fraction < 1 else afterState
+        if gameObject.rigidBody != None:
+            gameObject.rigidBody.velocity.Set(state[2] / Snapshot.velocityScale, state[3] / Snapshot.velocityScale)
+
+        if isinstance(gameObject, Counter) and gameObject.count != state[4]:
+            gameObject.count = state[4]
+            gameObject.UpdateCount()
+
+    def Close(self):
+        # tells the server the client left
+        self.channel.Send(bytes(WriteHeader(Snapshot.bye)), self.serverAddress)
+        self.channel.Flush()
+        self.channel.Close()
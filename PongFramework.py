@@ -1,8 +1,8 @@
 from GameFramework import *
 
 class PongGM(GameManager):
-    def __init__(self, screenSize, screenCaption, allowedEvents):
-        super().__init__(screenSize, screenCaption, allowedEvents)
+    def __init__(self, screenSize, screenCaption, allowedEvents, headless = False, seed = None):
+        super().__init__(screenSize, screenCaption, allowedEvents, headless, seed)
 
         #controlls
         self.wDown = False
@@ -10,7 +10,37 @@ class PongGM(GameManager):
         self.upDown = False
         self.downDown = False
 
-        self.currentScene = StartMenu(self)
+        #scenes are built when they are first used. A new match is built ahead of time, and the end menu is reused
+        self.RegisterScene("start menu", StartMenu)
+        self.RegisterScene("two player", TwoPlayer, preload=True)
+        self.RegisterScene("end menu", EndMenu, pooled=True)
+
+        self.ChangeScene("start menu")
+
+        #key of each action, and the flag each action sets while it is held
+        controls = {
+            "player 1 up": (pyg.K_w, "wDown"),
+            "player 1 down": (pyg.K_s, "sDown"),
+            "player 2 up": (pyg.K_UP, "upDown"),
+            "player 2 down": (pyg.K_DOWN, "downDown"),
+        }
+        self.controlFlags = {}
+
+        for action, (key, flag) in controls.items():
+            self.input.Bind(action, key)
+            self.input.Subscribe(action, self.OnControl)
+            self.controlFlags[action] = flag
+
+        #escape quits the game
+        self.input.Bind("quit", pyg.K_ESCAPE)
+        self.input.Subscribe("quit", self.OnQuit)
+
+    def OnControl(self, action, pressed):
+        setattr(self, self.controlFlags[action], pressed)
+
+    def OnQuit(self, action, pressed):
+        if pressed:
+            self.Quit()
 
 
 """
@@ -22,49 +52,58 @@ class StartMenu(Scene):
 
         playButtonSize = Vector2(176, 96)
         playButton = Button(self, gameManager.screenSize / 2 - playButtonSize / 2, playButtonSize, Colour.black, Colour.grey, "PLAY", 60, Colour.white, pyg.font.get_default_font(), Vector2(10, 10))
-        playButton.scripts.append(OnButtonPressedChangeScene(playButton, TwoPlayer(self.gameManager)))
+        playButton.scripts.append(OnButtonPressedChangeScene(playButton, "two player"))
 
 
 class TwoPlayer(Scene):
+    #collision layers. Paddles are stopped by the barriers, the puck bounces off the barriers and paddles and scores in the goals
+    barrierLayer = 1
+    paddleLayer = 2
+    puckLayer = 4
+    goalLayer = 8
+
     def __init__(self, gameManager):
         super().__init__(gameManager)
 
+        #the barriers, goals, and scores only change when a goal is scored, so they are drawn from one cached surface
+        self.renderList.SetStaticLayer(0)
+
         usedColours = []
 
-        barrierColour = GetUniqueColour(usedColours)
+        barrierColour = GetUniqueColour(usedColours, self.random)
         barrierOffset = Vector2(0, 70)
         barrierSize = Vector2(gameManager.screenSize.x, 30)
 
         topBarrier = Box(self, barrierOffset, barrierSize, barrierColour)
-        topBarrier.collider = BoxCollider(topBarrier, barrierSize)
+        topBarrier.collider = BoxCollider(topBarrier, barrierSize, TwoPlayer.barrierLayer, TwoPlayer.paddleLayer | TwoPlayer.puckLayer)
 
         bottomBarrierPosition = Vector2(0, gameManager.screenSize.y - barrierSize.y - barrierOffset.y)
         bottomBarrier = Box(self, bottomBarrierPosition, barrierSize, barrierColour)
-        bottomBarrier.collider = BoxCollider(bottomBarrier, barrierSize)
+        bottomBarrier.collider = BoxCollider(bottomBarrier, barrierSize, TwoPlayer.barrierLayer, TwoPlayer.paddleLayer | TwoPlayer.puckLayer)
 
         paddleSize = Vector2(16, 70)
         paddleYPosition = gameManager.screenSize.y / 2 - paddleSize.y / 2
         paddleXOffset = 30
 
-        paddleLeftColour = GetUniqueColour(usedColours)
+        paddleLeftColour = GetUniqueColour(usedColours, self.random)
         paddleLeft = Box(self, Vector2(paddleXOffset, paddleYPosition), paddleSize, paddleLeftColour)
-        paddleLeft.collider = BoxCollider(paddleLeft, paddleSize)
+        paddleLeft.collider = BoxCollider(paddleLeft, paddleSize, TwoPlayer.paddleLayer, TwoPlayer.barrierLayer | TwoPlayer.puckLayer)
         paddleLeft.scripts.append(PlayerController(paddleLeft, 1))
         paddleLeft.rigidBody = RigidBody(paddleLeft)
 
-        paddleRightColour = GetUniqueColour(usedColours)
+        paddleRightColour = GetUniqueColour(usedColours, self.random)
         paddleRight = Box(self, Vector2(gameManager.screenSize.x - paddleXOffset - paddleSize.x, paddleYPosition),
                           paddleSize, paddleRightColour)
-        paddleRight.collider = BoxCollider(paddleRight, paddleSize)
+        paddleRight.collider = BoxCollider(paddleRight, paddleSize, TwoPlayer.paddleLayer, TwoPlayer.barrierLayer | TwoPlayer.puckLayer)
         paddleRight.scripts.append(PlayerController(paddleRight, 2))
         paddleRight.rigidBody = RigidBody(paddleRight)
 
         goalSize = Vector2(100, gameManager.screenSize.y)
         goalLeft = Box(self, Vector2(-goalSize.x, 0), goalSize, Colour.black)
-        goalLeft.collider = BoxCollider(goalLeft, goalSize)
+        goalLeft.collider = BoxCollider(goalLeft, goalSize, TwoPlayer.goalLayer, TwoPlayer.puckLayer)
 
         goalRight = Box(self, Vector2(gameManager.screenSize.x, 0), goalSize, Colour.black)
-        goalRight.collider = BoxCollider(goalRight, goalSize)
+        goalRight.collider = BoxCollider(goalRight, goalSize, TwoPlayer.goalLayer, TwoPlayer.puckLayer)
 
         scoreY = 8
         scoreXSeparation = 140
@@ -78,10 +117,12 @@ class TwoPlayer(Scene):
         puckSize = Vector2(10, 10)
         puckStartPosition = gameManager.screenSize / 2 - puckSize / 2
         puck = Box(self, puckStartPosition, puckSize, Colour.white)
-        puck.collider = BoxCollider(puck, puckSize)
+        puck.collider = BoxCollider(puck, puckSize, TwoPlayer.puckLayer, TwoPlayer.barrierLayer | TwoPlayer.paddleLayer | TwoPlayer.goalLayer)
         puck.rigidBody = RigidBody(puck)
+        #the puck speeds up every time it is hit, so its whole path is tested to stop it passing through the paddles
+        puck.rigidBody.continuous = True
         puck.initialSpeed = 9
-        puck.rigidBody.velocity = RandomVelocity(puck.initialSpeed)
+        puck.rigidBody.velocity = RandomVelocity(puck.initialSpeed, self.random)
         puck.scripts.append(PuckController(puck, topBarrier, bottomBarrier, paddleLeft, paddleRight, goalLeft, goalRight, scoreLeft, scoreRight))
 
         maxScore = 2
@@ -89,6 +130,14 @@ class TwoPlayer(Scene):
         scoreKeeper.sprite.enabled = False
         scoreKeeper.scripts.append(ScoreKeeper(scoreKeeper, maxScore, "end menu", scoreLeft, scoreRight))
 
+        #kept so that the match can be controlled and its score read from outside the scene
+        self.paddleLeft = paddleLeft
+        self.paddleRight = paddleRight
+        self.puck = puck
+        self.scoreLeft = scoreLeft
+        self.scoreRight = scoreRight
+        self.scoreKeeper = scoreKeeper.scripts[0]
+
 
 class EndMenu(Scene):
     def __init__(self, gameManager, winner):
@@ -98,10 +147,18 @@ class EndMenu(Scene):
 
         playAgainButtonSize = Vector2(370, 96)
         playAgainButton = Button(self, gameManager.screenSize / 2 - playAgainButtonSize / 2 + Vector2.Up() * boxOfftset, playAgainButtonSize , Colour.black, Colour.grey, "PLAY AGAIN", 60, Colour.white, "Times New Roman", Vector2(10, 10))
-        playAgainButton.scripts.append(OnButtonPressedChangeScene(playAgainButton, TwoPlayer(self.gameManager)))
+        playAgainButton.scripts.append(OnButtonPressedChangeScene(playAgainButton, "two player"))
+        self.playAgainButton = playAgainButton
 
         winnerTextSize = Vector2(400, 96)
-        winnerText = TextBox(self, gameManager.screenSize / 2 - winnerTextSize / 2 + Vector2.Down() * boxOfftset, winnerTextSize, Colour.black, winner, 60, Colour.Random(), "Times New Roman", Vector2(10, 10))
+        self.winnerText = TextBox(self, gameManager.screenSize / 2 - winnerTextSize / 2 + Vector2.Down() * boxOfftset, winnerTextSize, Colour.black, winner, 60, Colour.Random(self.random), "Times New Roman", Vector2(10, 10))
+
+    def Reset(self, winner):
+        #the end menu is pooled, so it is reused for each winner
+        self.playAgainButton.Reset()
+
+        self.winnerText.textColour = Colour.Random(self.random)
+        self.winnerText.UpdateText(winner)
 
 
 
@@ -150,11 +207,13 @@ class PlayerController(Script):
 
 
         if self.down:
-            rigidBody.velocity = Vector2.Up() * PlayerController.speed
+            rigidBody.velocity.CopyFrom(Vector2.up)
+            rigidBody.velocity *= PlayerController.speed
         elif self.up:
-            rigidBody.velocity = Vector2.Down() * PlayerController.speed
+            rigidBody.velocity.CopyFrom(Vector2.down)
+            rigidBody.velocity *= PlayerController.speed
         else:
-            rigidBody.velocity = Vector2.Zero()
+            rigidBody.velocity.Set(0, 0)
 
 
 class PuckController(Script):
@@ -174,26 +233,34 @@ class PuckController(Script):
         
         self.velocityIncrease = 1
 
-    def Update(self):
-        if self.parent.collider.collisions != []:
+    def OnCollisionEnter(self, collider):
+        other = collider.parent
+
+        if other == self.top or other == self.bottom:
+            self.parent.rigidBody.velocity.y *= -1
 
-            for collision in self.parent.collider.collisions:
-                if collision.parent == self.top or collision.parent == self.bottom:
-                    self.parent.rigidBody.velocity.y *= -1
+        elif other == self.paddleL or other == self.paddleR:
+            #the puck bounces up or down off the top and bottom of a paddle
+            if self.parent.rigidBody.contactNormal.y != 0:
+                self.parent.rigidBody.velocity.y *= -1
+            else:
+                IncreaseSpeed(self.parent.rigidBody.velocity, self.velocityIncrease)
+                self.parent.rigidBody.velocity.x *= -1
 
-                if collision.parent == self.paddleL or collision.parent == self.paddleR:
-                    IncreaseSpeed(self.parent.rigidBody.velocity, self.velocityIncrease)
-                    self.parent.rigidBody.velocity.x *= -1
+        elif other == self.goalL:
+            ResetPuck(self.parent)
+            self.scoreR.count +=1
+            self.scoreR.UpdateCount()
 
-                if collision.parent == self.goalL:
-                    ResetPuck(self.parent)
-                    self.scoreR.count +=1
-                    self.scoreR.UpdateCount()
+        elif other == self.goalR:
+            ResetPuck(self.parent)
+            self.scoreL.count += 1
+            self.scoreL.UpdateCount()
 
-                elif collision.parent == self.goalR:
-                    ResetPuck(self.parent)
-                    self.scoreL.count += 1
-                    self.scoreL.UpdateCount()
+    def OnCollisionStay(self, collider):
+        #the puck could not move because it is still pushing into a collider it touched last tick, like a paddle that moved into its path
+        if self.parent.rigidBody.contactTime == 0:
+            self.OnCollisionEnter(collider)
 
 
 class ScoreKeeper(Script):
@@ -208,26 +275,28 @@ class ScoreKeeper(Script):
         self.scoreR = scoreRight
 
     def Update(self):
-        if self.scoreL.count == self.maxScore:
-            self.parent.scene.gameManager.ChangeScene(EndMenu(self.parent.scene.gameManager, "PLAYER 1 WINS"))
-        elif self.scoreR.count == self.maxScore:
-            self.parent.scene.gameManager.ChangeScene(EndMenu(self.parent.scene.gameManager, "PLAYER 2 WINS"))
+        #only checks the scores when one of them changes
+        while True:
+            yield WaitEvent(self.scoreL.onChanged, self.scoreR.onChanged)
+
+            if self.scoreL.count == self.maxScore:
+                self.parent.scene.gameManager.LoadScene(self.nextScene, "PLAYER 1 WINS")
+            elif self.scoreR.count == self.maxScore:
+                self.parent.scene.gameManager.LoadScene(self.nextScene, "PLAYER 2 WINS")
 
 
 """
 Custom functions
 """
-def RandomVelocity(speed):
-    #gives the puck a random diagonal velocity when a new point is started
+def RandomVelocity(speed, rand = random):
+    #gives the puck a random diagonal velocity when a new point is started. rand is the random module or a scene's random
 
-    rand = random.random()
-    if rand > 0.5:
+    if rand.random() > 0.5:
         x = speed
     else:
         x = -speed
 
-    rand = random.random()
-    if rand > 0.5:
+    if rand.random() > 0.5:
         y = speed
     else:
         y = -speed
@@ -251,17 +320,18 @@ def IncreaseSpeed(velocity, increaseMod):
 def ResetPuck(puck):
     #resets puck for a new point
     screenSize = puck.scene.gameManager.screenSize
-    puck.rigidBody.velocity = RandomVelocity(puck.initialSpeed)
+    puck.rigidBody.velocity = RandomVelocity(puck.initialSpeed, puck.scene.random)
 
-    puck.transform.position = screenSize / 2
+    #goals are handled after the tick's positions were saved for interpolation, so the puck is not drawn sliding back to the centre
+    puck.rigidBody.Teleport(screenSize / 2)
 
 
-def GetUniqueColour(usedColours):
+def GetUniqueColour(usedColours, rand = random):
     #returns a colour that has not been used
-    colour = Colour.Random()
+    colour = Colour.Random(rand)
 
     while colour in usedColours:
-        colour = Colour.Random()
+        colour = Colour.Random(rand)
 
     usedColours.append(colour)
     return colour
@@ -0,0 +1,56 @@
+import os
+
+#replays are run without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import time
+from collections import deque
+from PongFramework import *
+
+"""
+Replays a session recorded with python Main.py session.rec on a headless game manager, as fast as possible. The simulation matches the
+recorded one exactly, which is checked against the checksums in the recording, so a slow session can be profiled tick by tick.
+
+    python Replay.py session.rec --profile --trace trace.json
+"""
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Replays a recorded Pong session headlessly")
+    parser.add_argument("recording")
+    parser.add_argument("--profile", action="store_true", help="print the time spent in each phase and script")
+    parser.add_argument("--trace", help="write a Chrome trace of the replayed ticks to this file")
+    args = parser.parse_args()
+
+    pyg.font.init()
+    recording = InputRecording.Load(args.recording)
+
+    gameManager = PongGM(recording.screenSize, "Replay", [], headless=True, seed=recording.seed)
+
+    if args.profile or args.trace != None:
+        gameManager.profiler.enabled = True
+        #keep every tick of the replay
+        gameManager.profiler.frames = deque(maxlen=None)
+
+    startTime = time.perf_counter()
+    mismatches = gameManager.Replay(recording)
+    duration = time.perf_counter() - startTime
+
+    print("replayed {} ticks in {:.2f}s, {:.0f} ticks/s".format(gameManager.tick, duration, gameManager.tick / max(duration, 1e-9)))
+
+    if mismatches == []:
+        print("matches the recording")
+    else:
+        print("does not match the recording from tick {}".format(mismatches[0]))
+
+    if args.profile:
+        print(json.dumps(gameManager.profiler.GetSummary(), indent=1))
+
+    if args.trace != None:
+        gameManager.profiler.ToChromeTrace(args.trace)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,137 @@
+import os
+
+#the benchmark does not need a visible window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import gc
+import time
+from PongFramework import *
+
+"""
+Microbenchmark of the Vector2 allocations made each frame by the script and physics phases of GameManager.
+"Before" runs the allocating hot paths the engine used to have, "after" runs the current in-place ones.
+"""
+
+frames = 300
+objectCount = 1000
+
+
+class BenchmarkGM(PongGM):
+    def __init__(self, screenSize, screenCaption, allowedEvents):
+        super().__init__(screenSize, screenCaption, allowedEvents)
+
+        self.currentScene = BenchmarkScene(self)
+
+        #keep every paddle moving so PlayerController sets a velocity each frame
+        self.sDown = True
+
+
+class BenchmarkScene(Scene):
+    def __init__(self, gameManager):
+        super().__init__(gameManager)
+
+        size = Vector2(4, 4)
+
+        for i in range(objectCount):
+            position = Vector2((i % 100) * 10, (i // 100) * 10)
+            box = Box(self, position, size, Colour.white)
+            box.rigidBody = RigidBody(box)
+
+            #half the objects are paddles, the other half are rigid bodies without a collider
+            if i % 2 == 0:
+                box.collider = BoxCollider(box, size)
+                box.scripts.append(PlayerController(box, 1))
+            else:
+                box.rigidBody.velocity = Vector2(1, 1)
+
+
+"""
+Allocating versions of the hot paths
+"""
+def LegacyCast(self):
+    self.castPosition = self.parent.transform.position + self.velocity
+
+
+def LegacyPlayerUpdate(self):
+    rigidBody = self.parent.rigidBody
+    self.down = self.parent.gameManager.sDown
+    self.up = self.parent.gameManager.wDown
+
+    if self.down:
+        rigidBody.velocity = Vector2.Up() * PlayerController.speed
+    elif self.up:
+        rigidBody.velocity = Vector2.Down() * PlayerController.speed
+    else:
+        rigidBody.velocity = Vector2.Zero()
+
+
+def LegacyMoveRigidBodies(self):
+    for gameObject in self.currentScene.gameObjects:
+        if gameObject.rigidBody != None:
+            if gameObject.collider != None:
+                if gameObject.collider.collisions == []:
+                    gameObject.transform.position = gameObject.rigidBody.castPosition
+
+            else:
+                gameObject.transform.position = gameObject.rigidBody.castPosition
+                gameObject.rigidBody.velocity = Vector2.Zero()
+
+
+def Measure(gameManager):
+    # runs the script and physics phases, returning the Vector2 allocations and gen 0 garbage collections per frame, and ms per frame
+    allocations = [0]
+    collections = [0]
+
+    vectorInit = Vector2.__init__
+
+    def CountingInit(self, x, y):
+        allocations[0] += 1
+        vectorInit(self, x, y)
+
+    def CountCollections(phase, info):
+        if phase == "start" and info["generation"] == 0:
+            collections[0] += 1
+
+    Vector2.__init__ = CountingInit
+    gc.callbacks.append(CountCollections)
+
+    startTime = time.perf_counter()
+    for _ in range(frames):
+        gameManager.UpdateScripts()
+        gameManager.CastRigidBodies()
+        gameManager.UpdateCollisions()
+        gameManager.MoveRigidBodies()
+    frameTime = (time.perf_counter() - startTime) / frames * 1000
+
+    gc.callbacks.remove(CountCollections)
+    Vector2.__init__ = vectorInit
+
+    return allocations[0] / frames, collections[0] / frames, frameTime
+
+
+def Run():
+    pyg.init()
+    allowedEvents = [pyg.QUIT]
+
+    cast = RigidBody.Cast
+    playerUpdate = PlayerController.Update
+    moveRigidBodies = GameManager.MoveRigidBodies
+
+    RigidBody.Cast = LegacyCast
+    PlayerController.Update = LegacyPlayerUpdate
+    GameManager.MoveRigidBodies = LegacyMoveRigidBodies
+    before = Measure(BenchmarkGM(Vector2(1400, 800), "Benchmark", allowedEvents))
+
+    RigidBody.Cast = cast
+    PlayerController.Update = playerUpdate
+    GameManager.MoveRigidBodies = moveRigidBodies
+    after = Measure(BenchmarkGM(Vector2(1400, 800), "Benchmark", allowedEvents))
+
+    print("{} objects, {} frames".format(objectCount, frames))
+    print("{:<8}{:>22}{:>22}{:>16}".format("", "Vector2 allocs/frame", "gen 0 GCs/frame", "ms/frame"))
+    print("{:<8}{:>22.1f}{:>22.3f}{:>16.3f}".format("before", *before))
+    print("{:<8}{:>22.1f}{:>22.3f}{:>16.3f}".format("after", *after))
+
+
+if __name__ == "__main__":
+    Run()
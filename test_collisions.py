@@ -0,0 +1,33 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from PongFramework import *
+
+"""
+Regression checks for continuous collision. Run with python -m pytest
+"""
+
+
+def CreateTwoPlayer():
+    pyg.font.init()
+    gameManager = PongGM(Vector2(1400, 800), "Pong", [pyg.QUIT], True, 1)
+    gameManager.ChangeScene("two player")
+
+    return gameManager, gameManager.currentScene
+
+
+def test_PuckStopsAtPaddleBeforeGoal():
+    # a puck moving fast enough to cross the left paddle and reach the goal in one tick bounces off the paddle without scoring
+    gameManager, scene = CreateTwoPlayer()
+    puck = scene.puck
+    goalLeft = puck.scripts[0].goalL
+
+    puck.transform.position = Vector2(50, scene.paddleLeft.transform.position.y + 20)
+    puck.rigidBody.velocity = Vector2(-60, 0)
+    gameManager.Tick()
+
+    assert puck.collider.collisions == [scene.paddleLeft.collider]
+    assert goalLeft.collider.collisions == []
+    assert (scene.scoreLeft.count, scene.scoreRight.count) == (0, 0)
+    assert puck.rigidBody.velocity.x > 0